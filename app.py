@@ -37,16 +37,21 @@ import cv2
 import pandas as pd
 from tkinter import *
 from tkinter import messagebox, simpledialog, ttk
+from tkinter import font as tkfont
 from PIL import Image, ImageTk, ImageFilter
 from datetime import datetime, timedelta, date
 import numpy as np
 import threading
 import time
-from collections import Counter
 import shutil
 import queue
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 import json
+import csv
+import re
+import importlib.util
+import functools
 
 # --- GRACEFUL DEEPFACE IMPORT ---
 try:
@@ -61,6 +66,32 @@ except ImportError as e:
     )
     sys.exit()
 
+# --- OPTIONAL ONNX RUNTIME ACCELERATION ---
+# When prepare_models.py has exported an int8 VGG-Face graph, embeddings are computed
+# with ONNX Runtime instead of TensorFlow. Without it, DeepFace/TensorFlow is used.
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# --- OPTIONAL FAISS SEARCH FOR LARGE FACE DATABASES ---
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# --- OPTIONAL FAST JSON FOR USER DETAILS FILES ---
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# --- OPTIONAL FAST SCREEN CAPTURE FOR WHATSAPP AUTOMATION ---
+try:
+    import mss
+except ImportError:
+    mss = None
+
 # --- WHATSAPP & AUTOMATION LIBRARY IMPORTS ---
 try:
     import pywhatkit
@@ -109,6 +140,78 @@ class PlaceholderEntry(ttk.Entry):
                 self.configure(show='')
             self.configure(style="Placeholder.TEntry")
 
+# PyArrow's multithreaded CSV parser is used for the analytics reads when pyarrow is installed.
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+def read_csv_fast(path, **kwargs):
+    """pd.read_csv on the PyArrow engine when available, falling back to the C engine for options it rejects."""
+    if HAVE_PYARROW:
+        try: return pd.read_csv(path, engine='pyarrow', **kwargs)
+        except (ValueError, TypeError, ImportError): pass
+    return pd.read_csv(path, **kwargs)
+
+# JSON parser chosen once at import: orjson's C parser when installed, else the stdlib (both accept bytes).
+_json_loads = orjson.loads if orjson else json.loads
+
+def read_json_file(path):
+    """Parses a JSON file in one read, using orjson when it is installed."""
+    with open(path, 'rb') as f: return _json_loads(f.read())
+
+def write_json_file(path, data):
+    """Writes data as indented JSON, using orjson when it is installed."""
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2) if orjson else json.dumps(data, indent=4).encode('utf-8')
+    with open(path, 'wb') as f: f.write(payload)
+
+def locate_template(haystack, needle, threshold=0.9, levels=2):
+    """
+    Finds a grayscale needle in a grayscale haystack coarse-to-fine: a TM_CCOEFF_NORMED match
+    on an image pyramid `levels` pyrDowns deep, then a full-resolution match in a small window
+    around the best coarse hit. Returns the match centre (x, y) in haystack pixels, or None.
+    """
+    needle_h, needle_w = needle.shape[:2]
+    while levels > 0 and min(needle_h, needle_w) >> levels < 8: levels -= 1
+    hay_small, needle_small = haystack, needle
+    for _ in range(levels): hay_small, needle_small = cv2.pyrDown(hay_small), cv2.pyrDown(needle_small)
+    if hay_small.shape[0] < needle_small.shape[0] or hay_small.shape[1] < needle_small.shape[1]: return None
+    _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(hay_small, needle_small, cv2.TM_CCOEFF_NORMED))
+    if levels > 0:
+        # Downsampling blurs the match, so the coarse pass only proposes a candidate to refine.
+        if score < threshold - 0.2: return None
+        scale = 1 << levels; margin = max(8, 2 * scale)
+        x0, y0 = max(0, x * scale - margin), max(0, y * scale - margin)
+        window = haystack[y0:y * scale + needle_h + margin, x0:x * scale + needle_w + margin]
+        if window.shape[0] < needle_h or window.shape[1] < needle_w: return None
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(window, needle, cv2.TM_CCOEFF_NORMED))
+        x, y = x + x0, y + y0
+    return (x + needle_w // 2, y + needle_h // 2) if score >= threshold else None
+
+def load_thumbnail(img_path, size):
+    """Decodes an image straight to thumbnail size; safe to call off the Tk thread."""
+    img = Image.open(img_path)
+    # Let libjpeg decode at a reduced DCT scale instead of decoding full size and shrinking.
+    img.draft('RGB', (size[0] * 2, size[1] * 2)); img.thumbnail(size, Image.Resampling.BILINEAR)
+    return img
+
+# Recognition results that never identify a person.
+NON_IDENTITY_NAMES = frozenset(("Unknown", "Error", "Searching..."))
+
+# Registration input formats: letters/digits with spaces or underscores, and +CountryCodeNumber (E.164, max 15 digits).
+NAME_RE = re.compile(r'(?=.*[^\W_])[\w ]+')
+PHONE_RE = re.compile(r'\+\d{6,15}')
+
+# --- Cached Face Label Rendering ---
+@functools.lru_cache(maxsize=64)
+def render_label_tile(text, bg_color, text_color):
+    """
+    Renders a face label (text on a filled background) into a small BGR tile.
+    putText is expensive, so each distinct label is rasterized once and pasted afterwards.
+    """
+    (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+    tile = np.empty((text_h + 6, text_w + 10, 3), dtype=np.uint8)
+    tile[:] = bg_color
+    cv2.putText(tile, text, (5, text_h), cv2.FONT_HERSHEY_SIMPLEX, 0.7, text_color, 2)
+    return tile
+
 # --- Main Face Recognition Application Class ---
 class FaceRecognitionApp:
     def __init__(self, root, role="admin"):
@@ -136,6 +239,9 @@ class FaceRecognitionApp:
         self.COLOR_TEXT_DARK = "#2C3E50"
         self.COLOR_INPUT_BG = "#404040"
         self.root.configure(bg=self.COLOR_PRIMARY)
+        # Named fonts shared by the form widgets, so Tk resolves each font once.
+        self.FONT_FORM_LABEL = tkfont.Font(root=self.root, family="Segoe UI", size=11, weight="bold")
+        self.FONT_FORM_INPUT = tkfont.Font(root=self.root, family="Segoe UI", size=11)
 
         self.CV_COLOR_ACCENT = self.hex_to_bgr(self.COLOR_ACCENT)
         self.CV_COLOR_SUCCESS = self.hex_to_bgr(self.COLOR_SUCCESS)
@@ -148,8 +254,11 @@ class FaceRecognitionApp:
         self.student_attendance_file = "student_attendance.csv"
         self.faculty_attendance_file = "faculty_attendance.csv"
         self.salary_file = "salary.csv"
+        self.ATTENDANCE_COLUMNS = ["Name", "Department", "Date", "Time"]
+        self.SALARY_EXPORT_COLUMNS = ["name", "department", "monthly_salary", "daily_salary", "total_absents", "salary_deducted", "total_salary"]
         self.db_path = "face_database"
         self.LOG_COOLDOWN_SECONDS = 300
+        self.COOLDOWN_PRUNE_EVERY = 100  # Drop expired cooldowns after this many logged entries
         
         self.STUDENT_DEPARTMENTS = ["BSIT", "BS Cyber Security", "BBA", "BSCS", "ADP IT", "ADP Cyber Security", "Other ADP Program"]
         self.FACULTY_DEPARTMENTS = ["IT", "CS", "BBA", "Cyber Security"]
@@ -162,39 +271,95 @@ class FaceRecognitionApp:
         self.CONFIDENCE_THRESHOLD_PERCENT = 0.75
         self.REQUIRED_STABLE_FRAMES = 4
         self.HAAR_MIN_FACE_SIZE = (50, 50)
+        self.DNN_DETECTOR_PATH = os.path.join(os.environ.get('DEEPFACE_HOME', 'deepface_models'), 'face_detection_yunet_2023mar.onnx')
+        self.DNN_SCORE_THRESHOLD = 0.9
+        self.MOTION_PIXEL_THRESHOLD = 12       # Gray-level change for a pixel to count as motion
+        self.MOTION_AREA_FRACTION = 0.002      # Fraction of moving pixels that forces re-detection
+        self.MOTION_MAX_SKIPPED_FRAMES = 30    # Re-detect at least this often even in a static scene
+        self.REG_PREVIEW_FPS = 20              # Cap on registration preview repaints
+        self.REG_DETECTION_SCALE = 0.5         # Registration detects faces on a half-size frame
+        self.REG_MOTION_MEAN_THRESHOLD = 2.0   # Mean gray-level change below which registration reuses the last face box
+        self.SECONDARY_MATCH_MAX_SHIFT = 0.5   # Max centre shift (fraction of box width) for a secondary face to keep its label
 
         # --- MODEL CONFIGURATION FOR SPEED ---
         self.DEEPFACE_MODEL = 'VGG-Face'
         self.DEEPFACE_METRIC = 'cosine'
         self.DEEPFACE_DISTANCE_THRESHOLD = 0.40
-        self.DEEPFACE_DETECTOR_BACKEND = 'ssd'
+        self.DEEPFACE_DETECTOR_BACKEND = 'skip'  # Faces are already located by the Haar cascade; crops go straight to the model.
+        self.FACE_INPUT_SIZE = (224, 224)
+        self.BATCH_MAX = 8  # Max face crops embedded in a single forward pass
+        # One recognition worker: both ONNX Runtime and TensorFlow release the GIL inside their
+        # kernels and parallelize each batch internally, so extra workers would only oversubscribe.
+        self.RECOGNITION_WORKERS = 1
+        self.INFERENCE_THREADS = max(1, (os.cpu_count() or 2) // 2)  # Leave cores for capture, detection and Tk
+        self.FAISS_MIN_EMBEDDINGS = 2000         # Below this a NumPy matmul is as fast as FAISS
+        self.FAISS_HNSW_MIN_EMBEDDINGS = 10000   # Above this use an approximate HNSW graph
+        self.ONNX_MODEL_PATH = os.path.join(os.environ.get('DEEPFACE_HOME', 'deepface_models'), 'vgg_face_int8.onnx')
+        self.ONNX_PROVIDERS = ['DmlExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider']
+        # int8 quantization shifts cosine distances, so the ONNX model has its own threshold;
+        # re-tune it on labelled face pairs whenever vgg_face_int8.onnx is regenerated.
+        self.ONNX_DISTANCE_THRESHOLD = 0.40
 
         # --- State Variables ---
         self.database_ready = False
         self.locked_in_person = None
-        self.recognition_history = []
+        # Recognition history is a ring buffer of small integer name ids, tallied with np.bincount.
+        self.recognition_history = np.zeros(self.HISTORY_MAX_LENGTH, dtype=np.int16)
+        self.history_head = 0
+        self.history_length = 0
+        self.name_to_id = {}
+        self.id_to_name = []
         self.stable_recognition_count = 0
-        self.recently_logged = {}
+        self.recently_logged = {}  # name -> time.monotonic() deadline of the logging cooldown
+        self._logs_since_prune = 0
         self.last_recognition_result = ("Searching...", float('inf'))
+        self.last_secondary_results = []  # [((x, y, w, h), (name, distance)), ...] for the non-primary faces
         self.last_recognition_time = 0
         self.salary_data_for_export = []
+        self._users_cache = None  # (db_path mtime_ns, [{'name', 'folder_name'}, ...]) for get_absent_users
+        self._user_type_cache = {}  # folder_name -> user_type from details.json ('' if unset, None if unreadable)
+        self._user_loggers = {}     # display name -> attendance row builder from _build_attendance_logger
+        self._send_button_needle = None  # (mtime_ns, grayscale send_button.png) for WhatsApp automation
+        self._details_cache = {}    # folder_name -> (details.json mtime_ns, parsed details)
+        self._faculty_attendance_cache = None  # (mtime_ns, DataFrame) for salary calculations
+        self.TREE_FILL_CHUNK = 25   # Rows whose user type is filled in per idle callback
+        self.DETAILS_READ_WORKERS = 8  # Threads reading details.json files when the user list is rebuilt
+        self.LOG_INSERT_CHUNK = 500    # Attendance log rows inserted per idle callback
+        # (embeddings, display names, faiss index), replaced in one assignment so the
+        # recognition worker never sees a matrix from one load paired with names from another.
+        self.face_database = (None, [], None)
+        self.ort_session = None
+        self.ort_input_name = None
 
         # --- Threading and Queues ---
         self.write_lock = threading.Lock()
+        self._attendance_writers = {}  # target_file -> (line-buffered append handle, csv.writer)
         self.app_running = threading.Event()
         self.app_running.set()
         self.camera_thread = None
         self.processing_thread = None
-        self.raw_frame_queue = queue.Queue(maxsize=2)
-        self.processed_frame_queue = queue.Queue(maxsize=2)
-        self.recognition_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Recognition')
+        # Single-slot frame hand-offs: deque(maxlen=1) append/popleft are atomic, and a new
+        # frame simply replaces a stale one that was never consumed.
+        self.raw_frame_slot = deque(maxlen=1)
+        self.raw_frame_event = threading.Event()
+        self.processed_frame_slot = deque(maxlen=1)
+        self.recognition_executor = ThreadPoolExecutor(max_workers=self.RECOGNITION_WORKERS, thread_name_prefix='Recognition')
         self.recognition_future = None
 
+        # Persistent detection buffers, reused by the processing worker for every frame.
+        self._allocate_detection_buffers(640, 480)
+
         if not os.path.exists(self.db_path):
             os.makedirs(self.db_path)
 
         try:
             self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_alt2.xml')
+            self.use_opencl_haar = cv2.ocl.haveOpenCL()
+            self.opencl_haar_verified = False
+            if self.use_opencl_haar: cv2.ocl.setUseOpenCL(True)
+            self.face_detector = None
+            if os.path.exists(self.DNN_DETECTOR_PATH):
+                self.face_detector = cv2.FaceDetectorYN.create(self.DNN_DETECTOR_PATH, "", (320, 240), self.DNN_SCORE_THRESHOLD)
         except Exception as e:
             messagebox.showerror("OpenCV Error", f"Failed to load OpenCV components: {e}")
             self.root.destroy()
@@ -203,7 +368,9 @@ class FaceRecognitionApp:
         self.setup_styles()
         self.create_widgets()
 
-    def hex_to_bgr(self, hex_color):
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def hex_to_bgr(hex_color):
         hex_color = hex_color.lstrip('#')
         return tuple(int(hex_color[i:i+2], 16) for i in (4, 2, 0))
 
@@ -265,6 +432,18 @@ class FaceRecognitionApp:
         placeholder_img = Image.new('RGB', (video_width, video_height), self.COLOR_SECONDARY)
         self._placeholder_imgtk = ImageTk.PhotoImage(image=placeholder_img)
         self.video_label.configure(image=self._placeholder_imgtk, width=video_width, height=video_height)
+        # Persistent display buffers: the PIL image shares memory with the numpy array, and the
+        # PhotoImage is updated in place, so no images are allocated per displayed frame.
+        self.video_size = (video_width, video_height)
+        # RGBA is one of the modes Pillow maps onto the array without copying; an 'RGB' buffer
+        # would be copied by frombuffer and later writes would never reach the PhotoImage.
+        self._display_bgr = np.empty((video_height, video_width, 3), dtype=np.uint8)
+        self._display_rgba = np.zeros((video_height, video_width, 4), dtype=np.uint8)
+        self._display_img = Image.frombuffer('RGBA', (video_width, video_height), self._display_rgba, 'raw', 'RGBA', 0, 1)
+        self._display_imgtk = ImageTk.PhotoImage(image=self._display_img)
+        self._video_label_live = False
+        self._last_frame_signature = None
+        self._last_posted_status = None
         
         self.status_label = ttk.Label(self.root, text="Status: Initializing...", style='Status.TLabel'); self.status_label.pack(pady=(5, 5))
         
@@ -326,6 +505,9 @@ class FaceRecognitionApp:
         if self.recognition_executor: self.recognition_executor.shutdown(wait=False, cancel_futures=True)
         if self.camera_thread and self.camera_thread.is_alive(): self.camera_thread.join(timeout=1.0)
         if self.processing_thread and self.processing_thread.is_alive(): self.processing_thread.join(timeout=1.0)
+        with self.write_lock:
+            for fp, _ in self._attendance_writers.values(): fp.close()
+            self._attendance_writers.clear()
         self.log_message("Shutdown complete.")
 
     def manual_mark_attendance(self):
@@ -334,10 +516,10 @@ class FaceRecognitionApp:
 
     def initialize_attendance(self):
         try:
-            if not os.path.exists(self.student_attendance_file):
-                pd.DataFrame(columns=["Name", "Department", "Date", "Time"]).to_csv(self.student_attendance_file, index=False)
-            if not os.path.exists(self.faculty_attendance_file):
-                pd.DataFrame(columns=["Name", "Department", "Date", "Time"]).to_csv(self.faculty_attendance_file, index=False)
+            # Opening the append writers creates missing files with just the header row.
+            with self.write_lock:
+                for attendance_file in (self.student_attendance_file, self.faculty_attendance_file):
+                    self._get_attendance_writer(attendance_file, self.ATTENDANCE_COLUMNS)
         except Exception as e:
             self.log_message(f"Error initializing attendance files: {e}")
             messagebox.showerror("File Error", f"Could not initialize attendance files:\n{e}")
@@ -356,7 +538,7 @@ class FaceRecognitionApp:
             self.database_ready = False
             return
 
-        user_folders = [d for d in os.listdir(self.db_path) if os.path.isdir(os.path.join(self.db_path, d))]
+        with os.scandir(self.db_path) as entries: user_folders = [entry.name for entry in entries if entry.is_dir()]
         if not user_folders:
             if self.root.winfo_exists(): self.root.after(0, self._update_status, "Status: Database empty. Please register users.", self.COLOR_DANGER)
             self.log_message("Warning: Face database contains no user folders.")
@@ -367,18 +549,21 @@ class FaceRecognitionApp:
             self.log_message(f"Loading '{self.DEEPFACE_MODEL}' model... This may take a moment.")
             if self.root.winfo_exists(): self.root.after(0, self._update_status, "Status: Loading face recognition models...", self.COLOR_WARNING)
 
-            blank_image = np.zeros((100, 100, 3), dtype=np.uint8)
-            DeepFace.find(
-                img_path=blank_image,
-                db_path=self.db_path,
-                model_name=self.DEEPFACE_MODEL,
-                detector_backend=self.DEEPFACE_DETECTOR_BACKEND,
-                enforce_detection=False,
-                silent=True
-            )
+            if self.ort_session is None: self._load_onnx_session()
+            num_embeddings, num_computed = self._build_embedding_cache()
+            if num_embeddings == 0:
+                if self.root.winfo_exists(): self.root.after(0, self._update_status, "Status: No face images found. Please register users.", self.COLOR_DANGER)
+                self.log_message("Warning: Face database contains no usable face images.")
+                self.database_ready = False
+                return
+
+            if num_computed == 0:
+                # Every embedding came from the cache, so the model has not run yet. Warm it up on the
+                # recognition executor: the first recognition tick queues behind it instead of racing it.
+                self.recognition_executor.submit(self._warm_up_model)
             self.database_ready = True
             if self.root.winfo_exists(): self.root.after(0, self._update_status, "Status: Ready for live recognition.", self.COLOR_SUCCESS)
-            self.log_message(f"Database check passed. Found {len(user_folders)} users.")
+            self.log_message(f"Database check passed. Found {len(user_folders)} users ({num_embeddings} face samples).")
 
         except Exception as e:
             error_message = f"Could not initialize face recognition models: {e}"
@@ -390,6 +575,141 @@ class FaceRecognitionApp:
                 messagebox.showerror("Model Loading Failed", error_message)
             self.database_ready = False
     
+    def _load_onnx_session(self):
+        if ort is None or not os.path.exists(self.ONNX_MODEL_PATH): return
+        try:
+            available = ort.get_available_providers()
+            providers = [p for p in self.ONNX_PROVIDERS if p in available]
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.INFERENCE_THREADS
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            self.ort_session = ort.InferenceSession(self.ONNX_MODEL_PATH, sess_options=options, providers=providers)
+            self.ort_input_name = self.ort_session.get_inputs()[0].name
+            self.log_message(f"Using ONNX Runtime ({self.ort_session.get_providers()[0]}) for face embeddings.")
+        except Exception as e:
+            self.ort_session = None
+            self.log_message(f"Warning: Could not load ONNX model, falling back to TensorFlow. Error: {e}")
+
+    def _embedding_cache_path(self):
+        model_key = self.DEEPFACE_MODEL.lower().replace('-', '_')
+        return os.path.join(self.db_path, f"embeddings_{model_key}_{self._embedding_backend_key()}.npz")
+
+    def _embedding_backend_key(self):
+        # "_bgr" retires caches written when the ONNX branch fed RGB input.
+        return "onnx_int8_bgr" if self.ort_session is not None else self.DEEPFACE_DETECTOR_BACKEND
+
+    def _deepface_input(self, img):
+        """Prepares a BGR crop exactly like DeepFace.represent: aspect-preserving resize, zero padding, [0, 1] scale."""
+        target_w, target_h = self.FACE_INPUT_SIZE
+        factor = min(target_h / img.shape[0], target_w / img.shape[1])
+        resized = cv2.resize(img, (int(img.shape[1] * factor), int(img.shape[0] * factor)))
+        pad_h, pad_w = target_h - resized.shape[0], target_w - resized.shape[1]
+        padded = cv2.copyMakeBorder(resized, pad_h // 2, pad_h - pad_h // 2, pad_w // 2, pad_w - pad_w // 2, cv2.BORDER_CONSTANT, value=0)
+        return padded.astype(np.float32) / 255.0
+
+    def _represent_batch(self, face_crops):
+        """Returns a (K, D) float32 matrix of L2-normalized embeddings for K pre-cropped face images."""
+        if self.ort_session is not None:
+            batch = np.stack([self._deepface_input(img) for img in face_crops])
+            vectors = self.ort_session.run(None, {self.ort_input_name: batch})[0]
+        else:
+            vectors = [DeepFace.represent(img_path=img, model_name=self.DEEPFACE_MODEL, detector_backend=self.DEEPFACE_DETECTOR_BACKEND, enforce_detection=False, align=False)[0]['embedding'] for img in face_crops]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(face_crops), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-10)
+
+    def _build_embedding_cache(self):
+        """
+        Builds the (N, D) matrix of L2-normalized reference embeddings for every face
+        image in the database, with a parallel list of display names of the owners.
+        Embeddings are persisted next to the database keyed by file mtimes, so on
+        restart only new or modified images are passed through the model.
+        Returns (embeddings loaded, embeddings computed by the model).
+        """
+        image_entries = []
+        with os.scandir(self.db_path) as entries: folders = sorted((entry.name, entry.path) for entry in entries if entry.is_dir())
+        for folder_name, folder_path in folders:
+            # DirEntry.stat() is answered from the directory listing on Windows, saving a stat per image.
+            with os.scandir(folder_path) as entries:
+                images = sorted((entry.name, entry.path, entry.stat().st_mtime_ns) for entry in entries if entry.name.endswith('.jpg'))
+            image_entries.extend((img_path, mtime, folder_name) for _, img_path, mtime in images)
+
+        cache_path = self._embedding_cache_path()
+        cached = {}
+        try:
+            with np.load(cache_path) as data:
+                # Never mix ONNX and TensorFlow embeddings: both live in different vector spaces.
+                if str(data['backend']) != self._embedding_backend_key(): raise ValueError("embedding backend mismatch")
+                for path, mtime, vec in zip(data['paths'], data['mtimes'], data['embeddings']):
+                    cached[(str(path), int(mtime))] = vec
+        except (FileNotFoundError, OSError, KeyError, ValueError): pass
+
+        vectors, names, paths, mtimes = [], [], [], []
+        pending = []
+        for img_path, mtime, folder_name in image_entries:
+            vec = cached.get((img_path, mtime))
+            if vec is None:
+                pending.append((img_path, mtime, folder_name)); continue
+            vectors.append(vec); names.append(folder_name); paths.append(img_path); mtimes.append(mtime)
+
+        num_computed = 0
+        for start in range(0, len(pending), self.BATCH_MAX):
+            entries, images = [], []
+            for entry in pending[start:start + self.BATCH_MAX]:
+                img = cv2.imread(entry[0])
+                if img is not None: entries.append(entry); images.append(img)
+            if not images: continue
+            try:
+                batch_vectors = self._represent_batch(images)
+            except Exception as e:
+                self.log_message(f"Warning: Could not compute embeddings for {len(images)} images: {e}")
+                continue
+            for (img_path, mtime, folder_name), vec in zip(entries, batch_vectors):
+                vectors.append(vec); names.append(folder_name); paths.append(img_path); mtimes.append(mtime)
+            num_computed += len(images)
+
+        if vectors:
+            embeddings = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+            # Same zero-norm guard as _represent_batch: a blank crop must not become a NaN row.
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-10)
+        else:
+            embeddings = np.empty((0, 0), dtype=np.float32)
+
+        if num_computed or len(vectors) != len(cached):
+            try:
+                # Write to a temporary file and swap it in, so an interrupted save never leaves a
+                # truncated cache that would force every image to be re-embedded.
+                tmp_path = cache_path + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, embeddings=embeddings, paths=np.array(paths), mtimes=np.array(mtimes, dtype=np.int64), backend=np.array(self._embedding_backend_key()))
+                os.replace(tmp_path, cache_path)
+                self.log_message(f"Embedding cache updated: {num_computed} new, {len(vectors) - num_computed} reused.")
+            except Exception as e:
+                self.log_message(f"Warning: Could not save embedding cache. Error: {e}")
+
+        display_names = [folder_name.replace('_', ' ') for folder_name in names]
+        self.face_database = (embeddings, display_names, self._build_faiss_index(embeddings))
+        return len(names), num_computed
+
+    def _build_faiss_index(self, embeddings):
+        """Returns an inner-product FAISS index over the normalized embeddings for large databases, else None."""
+        if faiss is None or len(embeddings) < self.FAISS_MIN_EMBEDDINGS: return None
+        dim = embeddings.shape[1]
+        if len(embeddings) >= self.FAISS_HNSW_MIN_EMBEDDINGS:
+            index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(embeddings)
+        return index
+
+    def _warm_up_model(self):
+        """Runs one blank crop through the embedding model to materialize its graph."""
+        try:
+            self._represent_batch([np.zeros((self.FACE_INPUT_SIZE[1], self.FACE_INPUT_SIZE[0], 3), dtype=np.uint8)])
+        except Exception as e:
+            self.log_message(f"Warning: Model warm-up failed: {e}")
+
     def start_camera(self):
         self.stop_camera()
         self.app_running.set()
@@ -404,102 +724,231 @@ class FaceRecognitionApp:
         self.app_running.clear()
         if self.camera_thread and self.camera_thread.is_alive(): self.camera_thread.join(timeout=0.5)
         if self.processing_thread and self.processing_thread.is_alive(): self.processing_thread.join(timeout=0.5)
-        for q in [self.raw_frame_queue, self.processed_frame_queue]:
-            while not q.empty():
-                try: q.get_nowait()
-                except queue.Empty: pass
+        self.raw_frame_slot.clear(); self.raw_frame_event.clear()
+        self.processed_frame_slot.clear()
 
     def _camera_capture_worker(self):
         cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
         if not cap.isOpened():
             if self.root.winfo_exists(): self.root.after(0, self._update_status, f"Status: Camera {self.camera_index} not found!", self.COLOR_DANGER)
             return
+        # Request MJPG before setting the resolution: compressed frames need far less USB bandwidth than YUY2.
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640); cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480); cap.set(cv2.CAP_PROP_FPS, 30); cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         while self.app_running.is_set():
             ret, frame = cap.read()
             if not ret: time.sleep(0.01); continue
-            try: self.raw_frame_queue.put(frame, block=False)
-            except queue.Full: pass
+            self.raw_frame_slot.append(frame); self.raw_frame_event.set()
         cap.release()
 
     def _frame_processing_worker(self):
         while self.app_running.is_set():
+            if not self.raw_frame_event.wait(timeout=1.0): continue
+            self.raw_frame_event.clear()
             try:
-                frame = self.raw_frame_queue.get(timeout=1.0)
-            except queue.Empty:
+                frame = self.raw_frame_slot.popleft()
+            except IndexError:
                 continue
             
             frame = cv2.flip(frame, 1)
-            small_frame = cv2.resize(frame, (0, 0), fx=self.FRAME_PROCESS_SCALE_FACTOR, fy=self.FRAME_PROCESS_SCALE_FACTOR, interpolation=cv2.INTER_AREA)
-            gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=self.HAAR_MIN_FACE_SIZE)
+            if self._frame_shape != frame.shape[:2]:
+                self._allocate_detection_buffers(frame.shape[1], frame.shape[0])
+            cv2.resize(frame, self._small_size, dst=self._small_bgr, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._small_bgr, cv2.COLOR_BGR2GRAY, dst=self._small_gray)
+            if self._scene_is_static():
+                faces = self._last_faces
+            else:
+                faces = self._last_faces = self._detect_faces(self._small_bgr, self._small_gray)
             
-            face_coords = None
+            # Largest face first; it drives the attendance state, the rest are labelled only.
+            face_boxes = []
             if len(faces) > 0:
-                largest_face = max(faces, key=lambda rect: rect[2] * rect[3])
-                x, y, w, h = (int(c / self.FRAME_PROCESS_SCALE_FACTOR) for c in largest_face)
-                face_coords = (x, y, w, h)
+                faces = np.asarray(faces, dtype=np.int32)
+                order = np.argsort(-(faces[:, 2] * faces[:, 3]), kind='stable')[:self.BATCH_MAX]
+                scaled = (faces[order] / self.FRAME_PROCESS_SCALE_FACTOR).astype(np.int32)
+                face_boxes = [tuple(box) for box in scaled.tolist()]
+            face_coords = face_boxes[0] if face_boxes else None
 
             current_time = time.monotonic()
             is_recognition_running = self.recognition_future and self.recognition_future.running()
             
             if self.database_ready and face_coords and not is_recognition_running and (current_time - self.last_recognition_time > self.RECOGNITION_INTERVAL):
                 self.last_recognition_time = current_time
-                self.recognition_future = self.recognition_executor.submit(self._run_deepface_recognition, frame.copy())
+                face_crops = [cv2.resize(frame[y:y+h, x:x+w], self.FACE_INPUT_SIZE, interpolation=cv2.INTER_AREA) for (x, y, w, h) in face_boxes]
+                self.recognition_future = self.recognition_executor.submit(self._run_deepface_recognition, face_crops, face_boxes)
             
             self.update_recognition_state(self.last_recognition_result[0])
-            annotated_frame = self.draw_on_frame(frame, face_coords, self.last_recognition_result[0], self.last_recognition_result[1])
+            other_faces = self._match_secondary_results(face_boxes[1:])
+            annotated_frame = self.draw_on_frame(frame, face_coords, self.last_recognition_result[0], self.last_recognition_result[1], other_faces)
             
-            try:
-                self.processed_frame_queue.put(annotated_frame, block=False)
-            except queue.Full:
-                pass
+            self.processed_frame_slot.append(annotated_frame)
 
-    def _run_deepface_recognition(self, frame):
-        try:
-            dfs = DeepFace.find(img_path=frame, db_path=self.db_path, model_name=self.DEEPFACE_MODEL, distance_metric=self.DEEPFACE_METRIC, enforce_detection=False, detector_backend=self.DEEPFACE_DETECTOR_BACKEND, silent=True)
-            if isinstance(dfs, list) and len(dfs) > 0 and not dfs[0].empty:
-                df = dfs[0]
-                best_match = df.iloc[0]
-                distance = best_match['distance']
-                if distance < self.DEEPFACE_DISTANCE_THRESHOLD:
-                    identity_path = best_match['identity']
-                    name = os.path.basename(os.path.dirname(identity_path)).replace('_', ' ')
-                    self.last_recognition_result = (name, distance)
+    def _match_secondary_results(self, boxes):
+        """
+        Pairs each secondary face box with the stored result whose box centre is nearest, so labels
+        follow faces rather than list positions. Results whose face moved too far or left the frame
+        are dropped; boxes without a result are shown as "Searching...".
+        """
+        unmatched = list(self.last_secondary_results)
+        other_faces = []
+        for (x, y, w, h) in boxes:
+            cx, cy = x + w / 2, y + h / 2
+            best, best_shift = None, self.SECONDARY_MATCH_MAX_SHIFT * w
+            for i, ((px, py, pw, ph), _) in enumerate(unmatched):
+                shift = ((px + pw / 2 - cx) ** 2 + (py + ph / 2 - cy) ** 2) ** 0.5
+                if shift <= best_shift: best, best_shift = i, shift
+            if best is None:
+                other_faces.append(((x, y, w, h), "Searching...", float('inf')))
+            else:
+                name, distance = unmatched.pop(best)[1]
+                other_faces.append(((x, y, w, h), name, distance))
+        return other_faces
+
+    def _allocate_detection_buffers(self, frame_width, frame_height):
+        small_w = int(frame_width * self.FRAME_PROCESS_SCALE_FACTOR)
+        small_h = int(frame_height * self.FRAME_PROCESS_SCALE_FACTOR)
+        self._frame_shape = (frame_height, frame_width)
+        self._small_size = (small_w, small_h)
+        self._small_bgr = np.empty((small_h, small_w, 3), dtype=np.uint8)
+        self._small_gray = np.empty((small_h, small_w), dtype=np.uint8)
+        self._prev_small_gray = np.empty((small_h, small_w), dtype=np.uint8)
+        self._motion_diff = np.empty((small_h, small_w), dtype=np.uint8)
+        self._motion_pixel_limit = max(1, int(small_w * small_h * self.MOTION_AREA_FRACTION))
+        self._has_prev_gray = False
+        self._skipped_detections = 0
+        self._last_faces = ()
+
+    def _scene_is_static(self):
+        """
+        Cheap frame-difference gate run before face detection. Returns True when too few
+        pixels changed since the frame of the last detection, so its faces can be reused.
+        """
+        if self._has_prev_gray and self._skipped_detections < self.MOTION_MAX_SKIPPED_FRAMES:
+            cv2.absdiff(self._small_gray, self._prev_small_gray, dst=self._motion_diff)
+            cv2.threshold(self._motion_diff, self.MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self._motion_diff)
+            if cv2.countNonZero(self._motion_diff) < self._motion_pixel_limit:
+                self._skipped_detections += 1
+                return True
+        np.copyto(self._prev_small_gray, self._small_gray)
+        self._has_prev_gray = True
+        self._skipped_detections = 0
+        return False
+
+    def _detect_faces(self, small_frame, gray, min_size=None, scale_factor=1.1, min_neighbors=5):
+        """
+        Returns face boxes (x, y, w, h) in small-frame coordinates, no smaller than min_size
+        (HAAR_MIN_FACE_SIZE by default). scale_factor and min_neighbors tune the Haar fallback.
+        Uses the YuNet DNN detector when its model is bundled, otherwise the Haar cascade,
+        dispatching to OpenCL through a UMat when available.
+        Some OpenCL drivers silently return nothing for certain cascades, so the OpenCL
+        result is cross-checked against the CPU path until a face has been seen by both;
+        on a mismatch the CPU path is used for the rest of the session.
+        """
+        min_size = min_size or self.HAAR_MIN_FACE_SIZE
+        if self.face_detector is not None:
+            height, width = small_frame.shape[:2]
+            self.face_detector.setInputSize((width, height))
+            _, detections = self.face_detector.detect(small_frame)
+            if detections is None: return ()
+            boxes = np.maximum(detections[:, :4], 0).astype(np.int32)
+            min_w, min_h = min_size
+            return boxes[(boxes[:, 2] >= min_w) & (boxes[:, 3] >= min_h)]
+
+        if not self.use_opencl_haar:
+            return self.face_cascade.detectMultiScale(gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size)
+
+        faces = self.face_cascade.detectMultiScale(cv2.UMat(gray), scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size)
+        if not self.opencl_haar_verified:
+            cpu_faces = self.face_cascade.detectMultiScale(gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, minSize=min_size)
+            if len(cpu_faces) > 0:
+                if len(faces) > 0:
+                    self.opencl_haar_verified = True
+                    self.log_message("Face detection is using OpenCL acceleration.")
                 else:
-                    self.last_recognition_result = ("Unknown", distance)
+                    self.use_opencl_haar = False
+                    self.log_message("OpenCL face detection returned no results; using CPU detection.")
+                return cpu_faces
+        return faces
+
+    def _run_deepface_recognition(self, face_crops, face_boxes):
+        """Embeds all face crops in one batch; the first (largest) face becomes the primary result."""
+        try:
+            embeddings, names, faiss_index = self.face_database
+            if len(names) == 0:
+                results = [("Unknown", float('inf'))] * len(face_crops)
             else:
-                self.last_recognition_result = ("Unknown", float('inf'))
+                queries = self._represent_batch(face_crops)
+                if faiss_index is not None:
+                    similarities, indices = faiss_index.search(queries, 1)
+                    best_indices, best_distances = indices[:, 0], 1.0 - similarities[:, 0]
+                else:
+                    distances = 1.0 - queries @ embeddings.T
+                    best_indices = distances.argmin(axis=1)
+                    best_distances = distances[np.arange(len(best_indices)), best_indices]
+                threshold = self.ONNX_DISTANCE_THRESHOLD if self.ort_session is not None else self.DEEPFACE_DISTANCE_THRESHOLD
+                results = []
+                for best, distance in zip(best_indices.tolist(), best_distances.tolist()):
+                    if best < 0:
+                        results.append(("Unknown", float('inf')))
+                    elif distance < threshold:
+                        results.append((names[best], distance))
+                    else:
+                        results.append(("Unknown", distance))
         except Exception:
-            self.last_recognition_result = ("Unknown", float('inf'))
+            results = [("Unknown", float('inf'))] * len(face_crops)
+        self.last_secondary_results = list(zip(face_boxes[1:], results[1:]))
+        self.last_recognition_result = results[0]
 
     def _display_loop(self):
         if not self.app_running.is_set():
             if self.root.winfo_exists(): self.video_label.configure(image=self._placeholder_imgtk)
+            self._video_label_live = False
             return
         try:
-            annotated_frame = self.processed_frame_queue.get_nowait()
-            img = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
-            imgtk = ImageTk.PhotoImage(image=Image.fromarray(img))
-            if self.root.winfo_exists(): 
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
-        except queue.Empty:
-            pass
+            annotated_frame = self.processed_frame_slot.popleft()
+        except IndexError:
+            annotated_frame = None
+        if annotated_frame is not None:
+            # A coarse pixel sample is enough to tell whether anything visible changed; if not,
+            # skip the conversion and the PhotoImage paste (which forces a Tk redraw).
+            signature = hash(annotated_frame[::32, ::32].tobytes())
+            if signature != self._last_frame_signature or not self._video_label_live:
+                self._last_frame_signature = signature
+                # Upscale once, then convert straight into the buffer shared with self._display_img.
+                cv2.resize(annotated_frame, self.video_size, dst=self._display_bgr, interpolation=cv2.INTER_LINEAR)
+                cv2.cvtColor(self._display_bgr, cv2.COLOR_BGR2RGBA, dst=self._display_rgba)
+                self._display_imgtk.paste(self._display_img)
+                if self.root.winfo_exists() and not self._video_label_live:
+                    self.video_label.configure(image=self._display_imgtk)
+                    self._video_label_live = True
         if self.root.winfo_exists():
             self.root.after(self.DISPLAY_LOOP_MS, self._display_loop)
 
-    def update_recognition_state(self, name):
-        self.recognition_history.append(name)
-        if len(self.recognition_history) > self.HISTORY_MAX_LENGTH:
-            self.recognition_history.pop(0)
-
-        if not self.recognition_history: return
-
-        most_common_name, count = Counter(self.recognition_history).most_common(1)[0]
-        proportion = count / len(self.recognition_history)
+    def clear_recognition_history(self):
+        self.history_head = 0
+        self.history_length = 0
 
-        if (most_common_name not in ["Unknown", "Error", "Searching..."] and proportion >= self.CONFIDENCE_THRESHOLD_PERCENT):
+    def update_recognition_state(self, name):
+        # Runs once per processed frame: bind attributes to locals and write them back once.
+        name_to_id, id_to_name, max_length = self.name_to_id, self.id_to_name, self.HISTORY_MAX_LENGTH
+        name_id = name_to_id.get(name)
+        if name_id is None:
+            name_id = name_to_id[name] = len(id_to_name)
+            id_to_name.append(name)
+
+        head, length = self.history_head, self.history_length
+        history = self.recognition_history
+        history[head] = name_id
+        self.history_head = head + 1 if head + 1 < max_length else 0
+        if length < max_length: length += 1
+        self.history_length = length
+
+        counts = np.bincount(history[:length])
+        top_id = int(counts.argmax())
+        most_common_name = id_to_name[top_id]
+        proportion = counts[top_id] / length
+
+        if (most_common_name not in NON_IDENTITY_NAMES and proportion >= self.CONFIDENCE_THRESHOLD_PERCENT):
             if self.stable_recognition_count < self.REQUIRED_STABLE_FRAMES:
                 self.stable_recognition_count += 1
             else:
@@ -510,17 +959,17 @@ class FaceRecognitionApp:
             self.stable_recognition_count = 0
             if self.locked_in_person:
                  self.locked_in_person = None
-                 self.recognition_history.clear()
+                 self.clear_recognition_history()
                  if self.root.winfo_exists(): self.root.after(0, self.mark_attendance_btn.config, {'state': DISABLED})
 
-    def draw_on_frame(self, frame, face_coords, name, distance):
+    def draw_on_frame(self, frame, face_coords, name, distance, other_faces=()):
         status_text, status_color_hex = "Status: Searching for a face...", self.COLOR_ACCENT
         box_color_bgr, display_name = self.CV_COLOR_ACCENT, "Searching..."
 
         if self.locked_in_person:
-            is_on_cooldown = self.locked_in_person in self.recently_logged and datetime.now() < self.recently_logged[self.locked_in_person]
-            if is_on_cooldown:
-                remaining = int((self.recently_logged[self.locked_in_person] - datetime.now()).total_seconds())
+            remaining = self.recently_logged.get(self.locked_in_person, 0.0) - time.monotonic()
+            if remaining > 0:
+                remaining = int(remaining)
                 status_text, status_color_hex = f"Status: {self.locked_in_person} already logged. Cooldown: {remaining}s", self.COLOR_WARNING
                 box_color_bgr = self.CV_COLOR_WARNING
             else:
@@ -539,17 +988,32 @@ class FaceRecognitionApp:
                 box_color_bgr = self.CV_COLOR_ACCENT
         
         if face_coords:
-            x, y, w, h = face_coords
-            cv2.rectangle(frame, (x, y), (x+w, y+h), box_color_bgr, 2)
-            text = f"{display_name} (Dist: {distance:.2f})" if distance != float('inf') else display_name
-            (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-            cv2.rectangle(frame, (x, y - text_h - 15), (x + w, y - 10), box_color_bgr, -1)
-            cv2.putText(frame, text, (x + 5, y - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.CV_COLOR_TEXT_LIGHT, 2)
-
-        if self.root.winfo_exists(): self.root.after(0, self._update_status, status_text, status_color_hex)
-        return cv2.resize(frame, (960, 540), interpolation=cv2.INTER_AREA)
+            self._draw_face_box(frame, face_coords, display_name, distance, box_color_bgr)
+        for other_coords, other_name, other_distance in other_faces:
+            other_color = self.CV_COLOR_DANGER if other_name == "Unknown" else self.CV_COLOR_ACCENT
+            self._draw_face_box(frame, other_coords, other_name, other_distance, other_color)
+
+        if status_text != self._last_posted_status and self.root.winfo_exists():
+            self._last_posted_status = status_text
+            self.root.after(0, self._update_status, status_text, status_color_hex)
+        return frame
+
+    def _draw_face_box(self, frame, face_coords, display_name, distance, box_color_bgr):
+        x, y, w, h = face_coords
+        cv2.rectangle(frame, (x, y), (x+w, y+h), box_color_bgr, 2)
+        text = f"{display_name} (Dist: {distance:.2f})" if distance != float('inf') else display_name
+        tile = render_label_tile(text, box_color_bgr, self.CV_COLOR_TEXT_LIGHT)
+        tile_h, tile_w = tile.shape[:2]
+        top = y - tile_h - 9
+        cv2.rectangle(frame, (x, top), (x + w, y - 10), box_color_bgr, -1)
+        frame_h, frame_w = frame.shape[:2]
+        y0, x0, y1, x1 = max(top, 0), max(x, 0), min(top + tile_h, frame_h), min(x + tile_w, frame_w)
+        if y1 > y0 and x1 > x0:
+            frame[y0:y1, x0:x1] = tile[y0 - top:y1 - top, x0 - x:x1 - x]
 
     def _update_status(self, text, hex_color):
+        # Another thread changed the status, so the processing worker must post its next one again.
+        if text != self._last_posted_status: self._last_posted_status = None
         if self.root.winfo_exists() and self.status_label.winfo_exists():
             if self.status_label.cget('text') != text: self.status_label.config(text=text, foreground=hex_color)
 
@@ -591,37 +1055,27 @@ class FaceRecognitionApp:
         form_frame = ttk.Frame(form_win, padding="20"); form_frame.pack(expand=True, fill=BOTH)
         widgets = {}; row_idx = 0
         
-        ttk.Label(form_frame, text=f"{user_type} Name:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-        widgets['name'] = ttk.Entry(form_frame, width=40, font=("Segoe UI", 11)); widgets['name'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-        
-        ttk.Label(form_frame, text="Phone Number:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-        widgets['phone_number'] = PlaceholderEntry(form_frame, "+CountryCodeNumber (e.g., +14155552671)", width=40, font=("Segoe UI", 11));
-        widgets['phone_number'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
+        input_font = self.FONT_FORM_INPUT
+        def add_row(key, label, make):
+            nonlocal row_idx
+            widgets[key] = self._add_form_row(form_frame, row_idx, label, make); row_idx += 1
+            return widgets[key]
 
-        if user_type == 'Student':
-            ttk.Label(form_frame, text="Father's Name:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['father_name'] = ttk.Entry(form_frame, width=40, font=("Segoe UI", 11)); widgets['father_name'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-            
-            ttk.Label(form_frame, text="Registration No:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['reg_no'] = ttk.Entry(form_frame, width=40, font=("Segoe UI", 11)); widgets['reg_no'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-            
-            ttk.Label(form_frame, text="Department:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['department'] = ttk.Combobox(form_frame, values=self.STUDENT_DEPARTMENTS, state="readonly", width=38, font=("Segoe UI", 11)); widgets['department'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-            widgets['department'].set("Select Department")
+        add_row('name', f"{user_type} Name:", lambda: ttk.Entry(form_frame, width=40, font=input_font))
+        add_row('phone_number', "Phone Number:", lambda: PlaceholderEntry(form_frame, "+CountryCodeNumber (e.g., +14155552671)", width=40, font=input_font))
 
-            ttk.Label(form_frame, text="Address:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['address'] = ttk.Entry(form_frame, width=40, font=("Segoe UI", 11)); widgets['address'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
+        if user_type == 'Student':
+            add_row('father_name', "Father's Name:", lambda: ttk.Entry(form_frame, width=40, font=input_font))
+            add_row('reg_no', "Registration No:", lambda: ttk.Entry(form_frame, width=40, font=input_font))
+            add_row('department', "Department:", lambda: ttk.Combobox(form_frame, values=self.STUDENT_DEPARTMENTS, state="readonly", width=38, font=input_font)).set("Select Department")
+            add_row('address', "Address:", lambda: ttk.Entry(form_frame, width=40, font=input_font))
 
         elif user_type == 'Faculty':
-            ttk.Label(form_frame, text="Designation:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['designation'] = ttk.Entry(form_frame, width=40, font=("Segoe UI", 11)); widgets['designation'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-            
-            ttk.Label(form_frame, text="Department:", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5)
-            widgets['department'] = ttk.Combobox(form_frame, values=self.FACULTY_DEPARTMENTS, state="readonly", width=38, font=("Segoe UI", 11)); widgets['department'].grid(row=row_idx, column=1, pady=5, padx=5); row_idx += 1
-            widgets['department'].set("Select Department")
+            add_row('designation', "Designation:", lambda: ttk.Entry(form_frame, width=40, font=input_font))
+            add_row('department', "Department:", lambda: ttk.Combobox(form_frame, values=self.FACULTY_DEPARTMENTS, state="readonly", width=38, font=input_font)).set("Select Department")
             
             ttk.Separator(form_frame).grid(row=row_idx, columnspan=2, sticky="ew", pady=10); row_idx += 1
-            ttk.Label(form_frame, text="Salary Details", font=("Segoe UI", 11, "bold")).grid(row=row_idx, column=0, sticky="w", pady=5); row_idx += 1
+            ttk.Label(form_frame, text="Salary Details", font=self.FONT_FORM_LABEL).grid(row=row_idx, column=0, sticky="w", pady=5); row_idx += 1
 
             salary_type_var = StringVar(value="None")
             widgets['salary_type'] = salary_type_var
@@ -632,38 +1086,36 @@ class FaceRecognitionApp:
 
             salary_details_frame = ttk.Frame(form_frame); salary_details_frame.grid(row=row_idx, column=0, columnspan=2, pady=5); row_idx +=1
             
-            def update_salary_fields(*args):
-                for widget in salary_details_frame.winfo_children(): widget.destroy()
-                
-                widgets.pop('monthly_salary', None); widgets.pop('visiting_type', None); widgets.pop('visiting_rate', None)
+            # Both salary sub-forms are built once and shown or hidden when the selection changes.
+            regular_frame = ttk.Frame(salary_details_frame)
+            ttk.Label(regular_frame, text="Monthly Salary:", font=input_font).grid(row=0, column=0, sticky="w", padx=5)
+            widgets['monthly_salary'] = ttk.Entry(regular_frame, width=20, font=input_font); widgets['monthly_salary'].grid(row=0, column=1, sticky="w", padx=5)
+
+            visiting_type_var = StringVar(value="None")
+            widgets['visiting_type'] = visiting_type_var
+            visiting_frame = ttk.Frame(salary_details_frame)
+            visiting_type_frame = ttk.Frame(visiting_frame); visiting_type_frame.grid(row=0, column=0, columnspan=2, sticky='w')
+            ttk.Radiobutton(visiting_type_frame, text="Fixed Rate (30 days)", variable=visiting_type_var, value="Fixed").pack(side=LEFT, padx=5)
+            ttk.Radiobutton(visiting_type_frame, text="Per Day Rate", variable=visiting_type_var, value="PerDay").pack(side=LEFT, padx=5)
+            visiting_rate_frame = ttk.Frame(visiting_frame)
+            visiting_rate_label = ttk.Label(visiting_rate_frame, text="Fixed Amount:", font=input_font); visiting_rate_label.grid(row=0, column=0, sticky="w", padx=5)
+            widgets['visiting_rate'] = ttk.Entry(visiting_rate_frame, width=20, font=input_font); widgets['visiting_rate'].grid(row=0, column=1, sticky="w", padx=5)
 
+            def update_salary_fields(*args):
                 sel_type = salary_type_var.get()
-                if sel_type == "Regular":
-                    ttk.Label(salary_details_frame, text="Monthly Salary:", font=("Segoe UI", 11)).grid(row=0, column=0, sticky="w", padx=5)
-                    widgets['monthly_salary'] = ttk.Entry(salary_details_frame, width=20, font=("Segoe UI", 11)); widgets['monthly_salary'].grid(row=0, column=1, sticky="w", padx=5)
-                
-                elif sel_type == "Visiting":
-                    visiting_type_var = StringVar(value="None")
-                    widgets['visiting_type'] = visiting_type_var
-                    
-                    visiting_frame = ttk.Frame(salary_details_frame); visiting_frame.grid(row=0, column=0, columnspan=2, sticky='w')
-                    ttk.Radiobutton(visiting_frame, text="Fixed Rate (30 days)", variable=visiting_type_var, value="Fixed").pack(side=LEFT, padx=5)
-                    ttk.Radiobutton(visiting_frame, text="Per Day Rate", variable=visiting_type_var, value="PerDay").pack(side=LEFT, padx=5)
-
-                    visiting_rate_frame = ttk.Frame(salary_details_frame); visiting_rate_frame.grid(row=1, column=0, columnspan=2, sticky='w', pady=5)
-                    
-                    def update_visiting_rate_field(*args):
-                        for widget in visiting_rate_frame.winfo_children(): widget.destroy()
-                        widgets.pop('visiting_rate', None)
-                        
-                        visit_sel = visiting_type_var.get()
-                        if visit_sel in ["Fixed", "PerDay"]:
-                            label_text = "Fixed Amount:" if visit_sel == "Fixed" else "Per Day Amount:"
-                            ttk.Label(visiting_rate_frame, text=label_text, font=("Segoe UI", 11)).grid(row=0, column=0, sticky="w", padx=5)
-                            widgets['visiting_rate'] = ttk.Entry(visiting_rate_frame, width=20, font=("Segoe UI", 11)); widgets['visiting_rate'].grid(row=0, column=1, sticky="w", padx=5)
-
-                    visiting_type_var.trace("w", update_visiting_rate_field)
-            
+                if sel_type == "Regular": regular_frame.grid(row=0, column=0, columnspan=2, sticky='w')
+                else: regular_frame.grid_remove()
+                if sel_type == "Visiting": visiting_frame.grid(row=0, column=0, columnspan=2, sticky='w')
+                else: visiting_frame.grid_remove()
+
+            def update_visiting_rate_field(*args):
+                visit_sel = visiting_type_var.get()
+                if visit_sel in ["Fixed", "PerDay"]:
+                    visiting_rate_label.config(text="Fixed Amount:" if visit_sel == "Fixed" else "Per Day Amount:")
+                    visiting_rate_frame.grid(row=1, column=0, columnspan=2, sticky='w', pady=5)
+                else: visiting_rate_frame.grid_remove()
+
+            visiting_type_var.trace("w", update_visiting_rate_field)
             salary_type_var.trace("w", update_salary_fields)
 
         submit_btn = ttk.Button(form_frame, text="Save Details & Proceed", style="Success.TButton", command=lambda: self._process_registration(form_win, user_type, widgets))
@@ -671,11 +1123,17 @@ class FaceRecognitionApp:
         def on_cancel(): form_win.destroy(); self.start_camera()
         form_win.protocol("WM_DELETE_WINDOW", on_cancel)
 
+    def _add_form_row(self, parent, row, label_text, make_widget):
+        """Grids a bold label and the widget built by make_widget on one form row; returns the widget."""
+        ttk.Label(parent, text=label_text, font=self.FONT_FORM_LABEL).grid(row=row, column=0, sticky="w", pady=5)
+        widget = make_widget(); widget.grid(row=row, column=1, pady=5, padx=5)
+        return widget
+
     def _process_registration(self, form_win, user_type, widgets):
         details = {'user_type': user_type}
         
         name = widgets['name'].get().strip()
-        if not name or not name.replace('_', '').replace(' ', '').isalnum():
+        if not NAME_RE.fullmatch(name):
             messagebox.showerror("Invalid Input", "Name is required and must be alphanumeric.", parent=form_win)
             return
         details['name'] = name
@@ -685,7 +1143,7 @@ class FaceRecognitionApp:
         if phone_number == phone_widget.placeholder or not phone_number:
             messagebox.showerror("Invalid Input", "Phone Number is required.", parent=form_win)
             return
-        if not (phone_number.startswith('+') and phone_number[1:].isdigit()):
+        if not PHONE_RE.fullmatch(phone_number):
             messagebox.showerror("Invalid Input", "Phone number must be in the format +CountryCodeNumber (e.g., +14155552671).", parent=form_win)
             return
         details['phone_number'] = phone_number
@@ -752,20 +1210,30 @@ class FaceRecognitionApp:
 
         folder_name = name.replace(' ', '_')
         user_path = os.path.join(self.db_path, folder_name)
+        # The filesystem is the authority (case-insensitive on Windows, never stale); one stat per submit.
         if os.path.exists(user_path):
             if not messagebox.askyesno("User Exists", f"'{name}' already exists. Overwrite their data?", parent=form_win):
                 return
-            shutil.rmtree(user_path)
+            try:
+                shutil.rmtree(user_path)
+            except OSError as e:
+                messagebox.showerror("File Error", f"Could not remove the existing data for '{name}': {e}", parent=form_win)
+                return
         
         try:
             os.makedirs(user_path)
-            with open(os.path.join(user_path, 'details.json'), 'w') as f:
-                json.dump(details, f, indent=4)
+        except OSError as e:
+            # Includes a folder created since the check above; it belongs to someone else, so leave it alone.
+            messagebox.showerror("File Error", f"Could not create the user folder: {e}", parent=form_win)
+            return
+        try:
+            write_json_file(os.path.join(user_path, 'details.json'), details)
         except Exception as e:
             messagebox.showerror("File Error", f"Could not save user details: {e}", parent=form_win)
-            if os.path.exists(user_path): shutil.rmtree(user_path)
+            shutil.rmtree(user_path, ignore_errors=True)
             return
 
+        self.invalidate_user_caches()
         form_win.destroy()
         self.log_message(f"Saved details for new {user_type}: {name}.")
         self._launch_face_capture_window(name, user_path)
@@ -774,7 +1242,9 @@ class FaceRecognitionApp:
         reg_window = Toplevel(self.root); reg_window.title(f"Capturing Face: {name}"); reg_window.geometry("820x600")
         reg_window.resizable(False, False); reg_window.configure(bg=self.COLOR_PRIMARY); reg_window.transient(self.root); reg_window.grab_set()
         
-        reg_label = Label(reg_window, bg=self.COLOR_SECONDARY); reg_label.pack(padx=10, pady=10)
+        # One Tk image for the whole capture, created on the Tk thread and repainted in place by the worker's updates.
+        self._reg_photo = ImageTk.PhotoImage(width=800, height=450)
+        reg_label = Label(reg_window, bg=self.COLOR_SECONDARY, image=self._reg_photo); reg_label.pack(padx=10, pady=10)
         info_label = ttk.Label(reg_window, text="Preparing camera...", font=("Segoe UI", 12, "bold")); info_label.pack(pady=5)
         quality_label = ttk.Label(reg_window, text="", font=("Segoe UI", 10, "italic")); quality_label.pack(pady=2)
         progress = ttk.Progressbar(reg_window, orient=HORIZONTAL, length=400, mode='determinate'); progress.pack(pady=10)
@@ -792,55 +1262,103 @@ class FaceRecognitionApp:
         cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
         if not cap.isOpened():
             if reg_window.winfo_exists(): messagebox.showerror("Camera Error", "Cannot open camera.", parent=reg_window)
-            self.on_registration_cancel(reg_window, user_path, confirmed=True); return
+            self.on_registration_cancel(reg_window, user_path, confirmed=True)
+            self._delete_registration_data(user_path); return
         
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 800); cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 600)
         count, total_images, BLUR_THRESHOLD = 0, 80, 100.0
         prompts = {0: "Look STRAIGHT", 15: "Look slightly UP", 30: "Look slightly DOWN", 45: "Turn head LEFT", 60: "Turn head RIGHT"}
+        prompt_items = sorted(prompts.items(), reverse=True)
+        # Preview buffers are allocated once and pasted into self._reg_photo on the Tk thread.
+        preview_size = (800, 450)
+        self._reg_resized = np.empty((preview_size[1], preview_size[0], 3), dtype=np.uint8)
+        self._reg_buf = np.empty((preview_size[1], preview_size[0], 4), dtype=np.uint8)
+        reg_img = Image.frombuffer('RGBA', preview_size, self._reg_buf, 'raw', 'RGBA', 0, 1)
+        last_ui_ts, ui_interval = 0.0, 1.0 / self.REG_PREVIEW_FPS
+        reg_small, reg_small_gray, reg_scale = None, None, self.REG_DETECTION_SCALE
+        reg_prev_gray, reg_last_faces, reg_skipped = None, None, 0
+        # JPEG encoding and disk writes happen on a writer thread; the bounded queue applies backpressure.
+        save_queue = queue.Queue(maxsize=8)
+        writer_thread = threading.Thread(target=self._image_writer_worker, args=(save_queue,), daemon=True); writer_thread.start()
+        reg_min_face = (int(150 * reg_scale), int(150 * reg_scale))
         
         while self.capture_running_event.is_set() and count < total_images:
             ret, frame = cap.read()
             if not ret or not reg_window.winfo_exists(): break
             
-            frame = cv2.flip(frame, 1); gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.2, 6, minSize=(150, 150))
-            current_prompt = next(prompts[p] for p in sorted(prompts.keys(), reverse=True) if count >= p)
-            display_frame, info_text, quality_text = frame.copy(), "No face detected.", ""
+            frame = cv2.flip(frame, 1)
+            # Detect on a downscaled copy (a quarter of the pixels) and scale boxes back up.
+            if reg_small is None:
+                reg_small_size = (int(frame.shape[1] * reg_scale), int(frame.shape[0] * reg_scale))
+                reg_small = np.empty((reg_small_size[1], reg_small_size[0], 3), dtype=np.uint8)
+                reg_small_gray = np.empty((reg_small_size[1], reg_small_size[0]), dtype=np.uint8)
+                reg_prev_gray = np.empty_like(reg_small_gray)
+            cv2.resize(frame, reg_small_size, dst=reg_small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(reg_small, cv2.COLOR_BGR2GRAY, dst=reg_small_gray)
+            # While the user holds still, reuse the last face box instead of re-detecting.
+            if (reg_last_faces is not None and reg_skipped < self.MOTION_MAX_SKIPPED_FRAMES
+                    and cv2.norm(reg_small_gray, reg_prev_gray, cv2.NORM_L1) / reg_small_gray.size < self.REG_MOTION_MEAN_THRESHOLD):
+                faces = reg_last_faces; reg_skipped += 1
+            else:
+                # Registration keeps its stricter Haar settings: fewer pyramid levels, fewer false-positive crops.
+                faces = self._detect_faces(reg_small, reg_small_gray, min_size=reg_min_face, scale_factor=1.2, min_neighbors=6)
+                if len(faces) > 0: faces = (np.asarray(faces, dtype=np.int32) / reg_scale).astype(np.int32)
+                np.copyto(reg_prev_gray, reg_small_gray); reg_last_faces, reg_skipped = faces, 0
+            current_prompt = next(text for threshold, text in prompt_items if count >= threshold)
+            # The box is drawn straight onto the frame: the saved crop is copied out before drawing.
+            display_frame, info_text, quality_text = frame, "No face detected.", ""
             box_color = self.CV_COLOR_DANGER
 
             if len(faces) == 1:
-                (x, y, w, h) = faces[0]; face_roi_gray = gray[y:y+h, x:x+w]
-                laplacian_var = cv2.Laplacian(face_roi_gray, cv2.CV_64F).var(); is_blurry = laplacian_var < BLUR_THRESHOLD
+                (x, y, w, h) = faces[0].tolist(); face_roi_gray = cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+                # 16-bit Laplacian (|value| <= 4*255 fits) instead of a float64 image; variance = std^2.
+                _, lap_std = cv2.meanStdDev(cv2.Laplacian(face_roi_gray, cv2.CV_16S))
+                laplacian_var = float(lap_std[0, 0]) ** 2; is_blurry = laplacian_var < BLUR_THRESHOLD
                 if w < 200 or h < 200: quality_text, box_color = "Please move closer.", self.CV_COLOR_WARNING
                 elif is_blurry: quality_text, box_color = "Blurry image, hold still.", self.CV_COLOR_WARNING
                 else:
                     quality_text, box_color = "Excellent! Capturing...", self.CV_COLOR_SUCCESS
                     info_text = f"{current_prompt} ({count+1}/{total_images})"
-                    face_img_to_save = frame[y:y+h, x:x+w]
-                    cv2.imwrite(os.path.join(user_path, f"{count}.jpg"), face_img_to_save)
-                    count += 1; time.sleep(0.05)
+                    save_queue.put((os.path.join(user_path, f"{count}.jpg"), frame[y:y+h, x:x+w].copy()))
+                    count += 1
                 cv2.rectangle(display_frame, (x,y), (x+w, y+h), box_color, 2)
             elif len(faces) > 1: info_text = "ERROR: Multiple faces detected!"
             
-            def update_reg_ui(img_tk):
+            def update_reg_ui():
                 if reg_window.winfo_exists():
                     info_label.config(text=info_text); quality_label.config(text=quality_text)
-                    progress.config(value=count * (100 / total_images)); reg_label.config(image=img_tk); reg_label.imgtk = img_tk
+                    progress.config(value=count * (100 / total_images))
+                    self._reg_photo.paste(reg_img)
             
-            img = cv2.resize(display_frame, (800, 450)); imgtk = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
-            if self.root.winfo_exists(): self.root.after(0, update_reg_ui, imgtk)
+            # Repaint at a capped rate; frames in between are dropped rather than queued on Tk.
+            now_ts = time.monotonic()
+            if now_ts - last_ui_ts < ui_interval: continue
+            last_ui_ts = now_ts
+            cv2.resize(display_frame, preview_size, dst=self._reg_resized)
+            cv2.cvtColor(self._reg_resized, cv2.COLOR_BGR2RGBA, dst=self._reg_buf)
+            if self.root.winfo_exists(): self.root.after(0, update_reg_ui)
         
         cap.release()
+        save_queue.put(None); writer_thread.join()
         if reg_window.winfo_exists(): reg_window.destroy()
 
         if self.capture_running_event.is_set():
             if self.root.winfo_exists():
                 self.root.after(0, self._finalize_registration, name)
         else:
+            # Deleted only now: the writer thread has flushed every queued crop into user_path.
+            self._delete_registration_data(user_path)
             self.log_message("Registration cancelled. Restarting camera.")
             if self.root.winfo_exists():
                 self.root.after(100, self.start_camera)
 
+    def _image_writer_worker(self, save_queue):
+        """Writes (path, image) pairs from the queue until it receives None."""
+        while True:
+            item = save_queue.get()
+            if item is None: return
+            if not cv2.imwrite(*item): self.log_message(f"Warning: Could not save {item[0]}.")
+
     def _finalize_registration(self, name):
         """
         Runs on the main GUI thread after face capture is complete.
@@ -867,73 +1385,100 @@ class FaceRecognitionApp:
             self.start_camera()
             
     def _clear_deepface_cache(self):
-        """Finds and removes the DeepFace representation pickle file."""
+        """
+        Removes representation pickles left in the database by DeepFace.find.
+        The embedding cache itself is keyed by image mtimes and updates incrementally,
+        so it is kept: only the new or deleted user's images change on the next rebuild.
+        """
         try:
-            pkl_file_name = f"representations_{self.DEEPFACE_MODEL.lower()}.pkl"
-            pkl_path = os.path.join(self.db_path, pkl_file_name)
-            if os.path.exists(pkl_path):
-                os.remove(pkl_path)
-                self.log_message(f"Removed stale database cache: {pkl_file_name}")
+            with os.scandir(self.db_path) as entries:
+                stale = [entry for entry in entries if entry.name.endswith('.pkl') and entry.name.startswith(('representations_', 'ds_')) and entry.is_file()]
+            for entry in stale:
+                os.remove(entry.path)
+                self.log_message(f"Removed stale database cache: {entry.name}")
         except Exception as e:
             self.log_message(f"Warning: Could not remove database cache file. It might be in use. Error: {e}")
 
     def on_registration_cancel(self, reg_window, user_path, confirmed=False):
         if confirmed or messagebox.askyesno("Cancel Registration?", "All captured images for this user will be deleted.", parent=reg_window):
+            # The capture worker deletes user_path after its image writer has drained the queue.
             self.capture_running_event.clear()
-            if os.path.exists(user_path):
-                try:
-                    shutil.rmtree(user_path)
-                    self.log_message("Registration cancelled by user and data deleted.")
-                except Exception as e:
-                    self.log_message(f"Error deleting user data on cancel: {e}")
             if reg_window.winfo_exists():
                 reg_window.destroy()
 
+    def _delete_registration_data(self, user_path):
+        if os.path.exists(user_path):
+            try:
+                shutil.rmtree(user_path)
+                self.invalidate_user_caches()
+                self.log_message("Registration cancelled by user and data deleted.")
+            except Exception as e:
+                self.log_message(f"Error deleting user data on cancel: {e}")
+
     def mark_attendance(self, name):
-        now = datetime.now()
-        if name in self.recently_logged and now < self.recently_logged[name]:
+        if time.monotonic() < self.recently_logged.get(name, 0.0):
             return
+        make_entry = self._user_loggers.get(name)
+        if make_entry is None:
+            make_entry = self._build_attendance_logger(name)
+            if make_entry is None: return
+            self._user_loggers[name] = make_entry
+        target_file, columns, row = make_entry(datetime.now())
+        log_text = f"LOGGED: {name} ({row[1]}) at {row[3]}"
+        # Only the append and the cooldown update are serialized; the cooldown is re-checked so
+        # two concurrent calls for the same person cannot both log.
+        with self.write_lock:
+            now_ts = time.monotonic()
+            if now_ts < self.recently_logged.get(name, 0.0): return
+            try:
+                self._get_attendance_writer(target_file, columns).writerow(row)
+            except Exception as e:
+                self.log_message(f"ERROR writing to {target_file}: {e}"); return
+            self.recently_logged[name] = now_ts + self.LOG_COOLDOWN_SECONDS
+            self._logs_since_prune += 1
+            if self._logs_since_prune >= self.COOLDOWN_PRUNE_EVERY:
+                self.recently_logged = {n: deadline for n, deadline in self.recently_logged.items() if deadline > now_ts}
+                self._logs_since_prune = 0
+
+        self.log_message(log_text)
+        self.locked_in_person = None
+        self.clear_recognition_history()
+        if self.root.winfo_exists():
+            self.mark_attendance_btn.config(state=DISABLED)
 
-        folder_name = name.replace(' ', '_')
-        detail_path = os.path.join(self.db_path, folder_name, 'details.json')
-
+    def _build_attendance_logger(self, name):
+        """
+        Resolves a user's attendance file and department from details.json once, returning a
+        function that builds (target_file, columns, row) for a timestamp. Returns None if the
+        user cannot be logged.
+        """
+        detail_path = os.path.join(self.db_path, name.replace(' ', '_'), 'details.json')
         if not os.path.exists(detail_path):
             self.log_message(f"ERROR: Details file not found for {name}. Cannot mark attendance.")
-            return
-
+            return None
         try:
-            with open(detail_path, 'r') as f: details = json.load(f)
+            details = self._load_details(name.replace(' ', '_'))
         except Exception as e:
-            self.log_message(f"ERROR: Could not read details for {name}: {e}"); return
-        
+            self.log_message(f"ERROR: Could not read details for {name}: {e}"); return None
+
         user_type = details.get('user_type', 'Unknown')
         department = details.get('department', 'N/A')
-
-        if user_type == 'Student':
-            target_file = self.student_attendance_file
-            columns = ["Name", "Department", "Date", "Time"]
-            entry_data = [[name, department, now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S')]]
-        elif user_type == 'Faculty':
-            target_file = self.faculty_attendance_file
-            columns = ["Name", "Department", "Date", "Time"]
-            entry_data = [[name, department, now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S')]]
+        if user_type == 'Student': target_file = self.student_attendance_file
+        elif user_type == 'Faculty': target_file = self.faculty_attendance_file
         else:
             self.log_message(f"WARNING: Unknown user type '{user_type}' for {name}. Attendance not logged.")
-            return
-
-        with self.write_lock:
-            try:
-                entry = pd.DataFrame(entry_data, columns=columns)
-                entry.to_csv(target_file, mode='a', header=not os.path.exists(target_file) or os.path.getsize(target_file) == 0, index=False)
-                
-                self.log_message(f"LOGGED: {name} ({department}) at {now.strftime('%H:%M:%S')}")
-                self.recently_logged[name] = now + timedelta(seconds=self.LOG_COOLDOWN_SECONDS)
-                self.locked_in_person = None
-                self.recognition_history.clear()
-                if self.root.winfo_exists():
-                    self.mark_attendance_btn.config(state=DISABLED)
-            except Exception as e:
-                self.log_message(f"ERROR writing to {target_file}: {e}")
+            return None
+        columns = self.ATTENDANCE_COLUMNS
+        return lambda now: (target_file, columns, [name, department, now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S')])
+
+    def _get_attendance_writer(self, target_file, columns):
+        """Returns a csv.writer on a long-lived append handle, writing the header if the file is empty. Call with write_lock held."""
+        if target_file not in self._attendance_writers:
+            fp = open(target_file, 'a', newline='', buffering=1)
+            writer = csv.writer(fp)
+            if fp.tell() == 0: writer.writerow(columns)
+            self._attendance_writers[target_file] = (fp, writer)
+        return self._attendance_writers[target_file][1]
 
     def log_message(self, msg):
         def _log():
@@ -979,31 +1524,84 @@ class FaceRecognitionApp:
         else:
              ttk.Button(button_frame_stats, text="📜 View Attendance Log", command=self.show_student_attendance_log, style="TButton").pack(side=LEFT, expand=True, padx=5)
 
-    def get_absent_users(self):
-        all_users = []
+    def invalidate_user_caches(self):
+        """Drops cached per-user data; called whenever a user folder is added or removed."""
+        self._users_cache = None
+        self._user_type_cache.clear()
+        self._user_loggers.clear()
+
+    def _load_details(self, folder_name):
+        """
+        Returns a user's parsed details.json, cached by file mtime so each version is parsed once.
+        Raises OSError if the file is missing and ValueError if it is not valid JSON.
+        The returned dict is shared; callers must not modify it.
+        """
+        detail_path = os.path.join(self.db_path, folder_name, 'details.json')
+        mtime = os.stat(detail_path).st_mtime_ns
+        cached = self._details_cache.get(folder_name)
+        if cached is not None and cached[0] == mtime: return cached[1]
+        details = read_json_file(detail_path)
+        self._details_cache[folder_name] = (mtime, details)
+        return details
+
+    def _get_user_type(self, folder_name):
+        """Returns the user_type recorded in a user's details.json, reading each file at most once."""
+        if folder_name not in self._user_type_cache:
+            try:
+                self._user_type_cache[folder_name] = self._load_details(folder_name).get('user_type', '')
+            except Exception: self._user_type_cache[folder_name] = None
+        return self._user_type_cache[folder_name]
+
+    def _fill_user_types(self, tree, folder_names, column="type"):
+        """Fills the user type column a chunk of rows at a time, yielding to Tk between chunks."""
+        if not tree.winfo_exists(): return
+        for folder_name in folder_names[:self.TREE_FILL_CHUNK]:
+            if tree.exists(folder_name):
+                user_type = self._get_user_type(folder_name)
+                tree.set(folder_name, column, "Unknown" if user_type is None else (user_type or 'User').title())
+        if len(folder_names) > self.TREE_FILL_CHUNK:
+            self.root.after_idle(self._fill_user_types, tree, folder_names[self.TREE_FILL_CHUNK:], column)
+
+    def _load_user_meta(self, folder_name):
+        """Reads (display_name, user_type) from a user's details.json; safe to run off the Tk thread."""
+        display_name, user_type = folder_name.replace('_', ' '), None
         try:
-            user_folders = [d for d in os.listdir(self.db_path) if os.path.isdir(os.path.join(self.db_path, d))]
-            for folder_name in user_folders:
-                display_name = folder_name.replace('_', ' ')
-                details_path = os.path.join(self.db_path, folder_name, 'details.json')
-                try:
-                    if os.path.exists(details_path):
-                        with open(details_path, 'r') as f: details = json.load(f)
-                        display_name = details.get('name', display_name)
-                except (FileNotFoundError, json.JSONDecodeError): pass 
-                all_users.append({'name': display_name, 'folder_name': folder_name})
+            details = self._load_details(folder_name)
+            display_name, user_type = details.get('name', display_name), details.get('user_type', '')
+        except (OSError, ValueError): pass
+        return display_name, user_type
+
+    def _get_registered_users(self):
+        """Lists registered users, re-reading details.json files only when the database folder changed."""
+        db_mtime = os.stat(self.db_path).st_mtime_ns
+        if self._users_cache is not None and self._users_cache[0] == db_mtime:
+            return self._users_cache[1]
+        with os.scandir(self.db_path) as entries: user_folders = [entry.name for entry in entries if entry.is_dir()]
+        # The reads are I/O bound, so a few threads overlap the open/read latency of many small files.
+        with ThreadPoolExecutor(max_workers=self.DETAILS_READ_WORKERS) as executor:
+            metas = list(executor.map(self._load_user_meta, user_folders))
+        all_users = []
+        for folder_name, (display_name, user_type) in zip(user_folders, metas):
+            self._user_type_cache.setdefault(folder_name, user_type)
+            all_users.append({'name': display_name, 'folder_name': folder_name})
+        self._users_cache = (db_mtime, all_users)
+        return all_users
+
+    def get_absent_users(self):
+        try: all_users = self._get_registered_users()
         except FileNotFoundError: return [] 
 
         present_today = set()
         today_str = datetime.now().strftime('%Y-%m-%d')
+        frames = []
         for attendance_file in [self.student_attendance_file, self.faculty_attendance_file]:
             try:
                 if os.path.exists(attendance_file):
-                    df = pd.read_csv(attendance_file)
-                    if not df.empty:
-                        today_df = df[df['Date'] == today_str]
-                        present_today.update(today_df['Name'].unique())
-            except (FileNotFoundError, pd.errors.EmptyDataError): pass 
+                    frames.append(read_csv_fast(attendance_file, usecols=['Name', 'Date'], dtype={'Name': 'category', 'Date': 'string'}))
+            except (FileNotFoundError, ValueError, pd.errors.EmptyDataError): pass 
+        if frames:
+            all_df = pd.concat(frames, ignore_index=True)
+            present_today = set(all_df.loc[(all_df['Date'] == today_str).to_numpy(dtype=bool, na_value=False), 'Name'].astype(str).tolist())
 
         return [user for user in all_users if user['name'] not in present_today]
 
@@ -1027,14 +1625,10 @@ class FaceRecognitionApp:
         scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview); scrollbar.pack(side=RIGHT, fill="y")
         tree.configure(yscrollcommand=scrollbar.set)
         
+        # Names go in immediately; user types are filled in afterwards from idle callbacks.
         for user in absent_users:
-            folder_name = user['folder_name']; display_name = user['name']
-            user_type = "Unknown"
-            try:
-                with open(os.path.join(self.db_path, folder_name, 'details.json'), 'r') as f:
-                    details = json.load(f); user_type = details.get('user_type', 'User').title()
-            except Exception: pass
-            tree.insert("", "end", values=(display_name, user_type), iid=folder_name, tags=('user_item',))
+            tree.insert("", "end", values=(user['name'], "..."), iid=user['folder_name'], tags=('user_item',))
+        self.root.after_idle(self._fill_user_types, tree, [user['folder_name'] for user in absent_users])
 
         def send_alert_from_popup():
             selected_item_id = tree.focus()
@@ -1053,7 +1647,7 @@ class FaceRecognitionApp:
         if not os.path.exists(detail_path):
             messagebox.showerror("Error", f"Details file not found for user.", parent=parent_win); return
         try:
-            with open(detail_path, 'r') as f: details = json.load(f)
+            details = self._load_details(folder_name)
         except Exception as e:
             messagebox.showerror("Error", f"Could not read details file: {e}", parent=parent_win); return
 
@@ -1077,6 +1671,22 @@ class FaceRecognitionApp:
             self.log_message(f"Preparing to send absence alert to {name} via MS Edge.")
             threading.Thread(target=self._send_whatsapp_worker, args=(phone_number, message, parent_win), daemon=True).start()
 
+    def _load_send_button_needle(self, image_path):
+        """Returns the grayscale send-button template, decoding the PNG again only when the file changes."""
+        mtime = os.stat(image_path).st_mtime_ns
+        if self._send_button_needle is None or self._send_button_needle[0] != mtime:
+            self._send_button_needle = (mtime, cv2.imread(image_path, cv2.IMREAD_GRAYSCALE))
+        return self._send_button_needle[1]
+
+    @staticmethod
+    def _grab_screen_gray(region, screen_grabber=None):
+        """Captures a (left, top, width, height) screen region as a grayscale array, via mss when available."""
+        if screen_grabber is not None:
+            left, top, width, height = region
+            shot = screen_grabber.grab({'left': left, 'top': top, 'width': width, 'height': height})
+            return cv2.cvtColor(np.asarray(shot), cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(np.asarray(pyautogui.screenshot(region=region)), cv2.COLOR_RGB2GRAY)
+
     def _send_whatsapp_worker(self, phone_number, message, parent_win):
         try:
             send_button_image = 'send_button.png'
@@ -1102,21 +1712,33 @@ class FaceRecognitionApp:
             url = f"https://web.whatsapp.com/send?phone={phone_number}&text={encoded_message}"
             webbrowser.get('msedge').open(url)
             self.log_message(f"Opened WhatsApp for {phone_number}. Waiting for page to load...")
-            time.sleep(12)
-
-            send_button_location = None; start_time = time.time(); timeout = 30 
-            while time.time() - start_time < timeout:
-                try:
-                    send_button_location = pyautogui.locateCenterOnScreen(send_button_image, confidence=0.9)
-                    if send_button_location:
-                        self.log_message("Send button found. Sending message."); break
-                except pyautogui.PyAutoGUIException as e:
-                    if "needle" in str(e).lower() and "haystack" in str(e).lower():
-                         self.log_message("ERROR: DPI scaling issue detected by PyAutoGUI. Aborting automation.")
-                         self.root.after(0, lambda: messagebox.showerror("Automation Error", f"A screen scaling error occurred:\n'{e}'\n\nPlease set your Windows display scaling to 100% and restart the application.", parent=parent_win))
-                         return
-                    pass
-                time.sleep(1)
+            time.sleep(1)  # Let the browser take focus; page readiness is detected by the polling below.
+
+            # WhatsApp Web's send button sits in the bottom-right corner, so only that quadrant is searched.
+            screen_w, screen_h = pyautogui.size()
+            search_region = (screen_w // 2, screen_h // 2, screen_w - screen_w // 2, screen_h - screen_h // 2)
+            needle = self._load_send_button_needle(send_button_image)
+            if needle is None or needle.shape[0] > search_region[3] or needle.shape[1] > search_region[2]:
+                e = "the send button image is larger than the screen area being searched"
+                self.log_message("ERROR: DPI scaling issue detected. Aborting automation.")
+                self.root.after(0, lambda: messagebox.showerror("Automation Error", f"A screen scaling error occurred:\n'{e}'\n\nPlease set your Windows display scaling to 100% and restart the application.", parent=parent_win))
+                return
+            send_button_location = None; start_time = time.time(); timeout = 42; poll_delay = 0.2
+            # mss grabs straight into a BGRA buffer via the OS capture API; one grabber serves every poll.
+            screen_grabber = mss.mss() if mss else None
+            try:
+                while time.time() - start_time < timeout:
+                    try:
+                        haystack = self._grab_screen_gray(search_region, screen_grabber)
+                        hit = locate_template(haystack, needle, threshold=0.9)
+                        if hit:
+                            send_button_location = (search_region[0] + hit[0], search_region[1] + hit[1])
+                            self.log_message("Send button found. Sending message."); break
+                    except pyautogui.PyAutoGUIException: pass
+                    # Back off from quick retries towards one poll per second while the page is loading.
+                    time.sleep(poll_delay); poll_delay = min(poll_delay * 1.5, 1.0)
+            finally:
+                if screen_grabber is not None: screen_grabber.close()
 
             if send_button_location:
                 pyautogui.click(send_button_location)
@@ -1138,29 +1760,26 @@ class FaceRecognitionApp:
             self.root.after(0, lambda: messagebox.showerror("WhatsApp Error", error_message, parent=parent_win))
 
     def populate_users_tree(self, tree):
-        for i in tree.get_children(): tree.delete(i)
+        """Brings the user list up to date, touching only rows that were added, removed or renamed."""
         try:
-            user_folders = sorted([d for d in os.listdir(self.db_path) if os.path.isdir(os.path.join(self.db_path, d))])
-            users_to_display = 0
-            for folder_name in user_folders:
-                display_name = folder_name.replace('_', ' ')
-                try:
-                    details_path = os.path.join(self.db_path, folder_name, 'details.json')
-                    if not os.path.exists(details_path):
-                        if self.role == "user": continue
-                    with open(details_path, 'r') as f:
-                        details = json.load(f)
-                        display_name = details.get('name', display_name)
-                        if self.role == "user" and details.get('user_type') != 'Student': continue
-                except (FileNotFoundError, json.JSONDecodeError):
-                    if self.role == "user": continue
-                    pass
-                tree.insert("", "end", values=(display_name,), iid=folder_name, tags=('user_item',))
-                users_to_display += 1
-            if users_to_display == 0:
+            rows = []
+            for user in sorted(self._get_registered_users(), key=lambda u: u['folder_name']):
+                folder_name = user['folder_name']
+                if self.role == "user" and self._get_user_type(folder_name) != 'Student': continue
+                rows.append((folder_name, (user['name'],)))
+            if not rows:
                 msg = "No students registered yet." if self.role == "user" else "No users registered yet."
-                tree.insert("", "end", values=(msg,), iid="no_users", tags=('user_item',))
-        except FileNotFoundError: tree.insert("", "end", values=("Database directory not found!",), iid="no_db", tags=('user_item',))
+                rows.append(("no_users", (msg,)))
+        except FileNotFoundError: rows = [("no_db", ("Database directory not found!",))]
+
+        wanted = {iid for iid, _ in rows}
+        current = tree.get_children()
+        stale = [iid for iid in current if iid not in wanted]
+        if stale: tree.delete(*stale)
+        # Surviving rows are already in sorted order, so new rows can be inserted at their final index.
+        for index, (iid, values) in enumerate(rows):
+            if not tree.exists(iid): tree.insert("", index, values=values, iid=iid, tags=('user_item',))
+            elif tuple(tree.item(iid, 'values')) != values: tree.item(iid, values=values)
 
     def delete_user(self, tree):
         selected_item = tree.focus()
@@ -1169,14 +1788,26 @@ class FaceRecognitionApp:
         display_name = tree.item(selected_item)['values'][0]; folder_name = selected_item
         if messagebox.askyesno("Confirm Deletion", f"Are you sure you want to permanently delete '{display_name}'?\nThis action cannot be undone.", parent=tree.winfo_toplevel()):
             user_path = os.path.join(self.db_path, folder_name)
-            try:
-                shutil.rmtree(user_path)
-                self._clear_deepface_cache()
-                messagebox.showinfo("Success", f"User '{display_name}' has been deleted. The face database will now be re-checked.", parent=tree.winfo_toplevel())
-                self.log_message(f"Deleted user: {display_name}")
-                self.populate_users_tree(tree)
-                threading.Thread(target=self._initialize_models_and_verify_db, daemon=True).start()
-            except Exception as e: messagebox.showerror("Deletion Failed", f"An error occurred while deleting the user: {e}", parent=tree.winfo_toplevel())
+            threading.Thread(target=self._delete_user_worker, args=(user_path, folder_name, display_name, tree), daemon=True).start()
+
+    def _delete_user_worker(self, user_path, folder_name, display_name, tree):
+        """Removes a user's folder off the Tk thread, then refreshes caches and the list on the Tk thread."""
+        try:
+            shutil.rmtree(user_path); error = None
+        except Exception as e: error = e
+        if self.root.winfo_exists(): self.root.after(0, self._on_user_deleted, folder_name, display_name, tree, error)
+
+    def _on_user_deleted(self, folder_name, display_name, tree, error):
+        parent = tree.winfo_toplevel() if tree.winfo_exists() else self.root
+        if error is not None:
+            messagebox.showerror("Deletion Failed", f"An error occurred while deleting the user: {error}", parent=parent); return
+        self._details_cache.pop(folder_name, None)
+        self.invalidate_user_caches()
+        self._clear_deepface_cache()
+        self.log_message(f"Deleted user: {display_name}")
+        if tree.winfo_exists(): self.populate_users_tree(tree)
+        threading.Thread(target=self._initialize_models_and_verify_db, daemon=True).start()
+        messagebox.showinfo("Success", f"User '{display_name}' has been deleted. The face database will now be re-checked.", parent=parent)
 
     def _display_attendance_log(self, title, filename):
         log_win = Toplevel(self.root)
@@ -1184,7 +1815,11 @@ class FaceRecognitionApp:
         log_win.configure(bg=self.COLOR_PRIMARY); log_win.transient(self.root); log_win.grab_set()
 
         try:
-            df = pd.read_csv(filename)
+            # Only the known log columns are shown; anything else in the file is not parsed. The
+            # header is read up front because the PyArrow engine rejects a callable usecols.
+            with open(filename, newline='') as f: header = next(csv.reader(f), [])
+            if not header: raise pd.errors.EmptyDataError("No columns to parse from file")
+            df = read_csv_fast(filename, usecols=[col for col in header if col in self.ATTENDANCE_COLUMNS], dtype=str)
         except (FileNotFoundError, pd.errors.EmptyDataError):
             ttk.Label(log_win, text="Attendance file is empty or not found.", font=("Segoe UI", 14)).pack(pady=50); return
 
@@ -1194,14 +1829,20 @@ class FaceRecognitionApp:
         tree.tag_configure('log_item', foreground=self.COLOR_TEXT_LIGHT)
         
         df_sorted = df.sort_values(by=["Date", "Time"], ascending=[False, False])
-        for index, row in df_sorted.iterrows():
-            tree.insert("", "end", values=list(row), tags=('log_item',))
+        self._insert_rows_chunked(tree, list(df_sorted.itertuples(index=False, name=None)), ('log_item',))
 
         vsb = ttk.Scrollbar(log_win, orient="vertical", command=tree.yview)
         hsb = ttk.Scrollbar(log_win, orient="horizontal", command=tree.xview)
         tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
         vsb.pack(side='right', fill='y'); hsb.pack(side='bottom', fill='x'); tree.pack(expand=True, fill='both', padx=10, pady=10)
 
+    def _insert_rows_chunked(self, tree, rows, tags=()):
+        """Inserts row tuples into a Treeview LOG_INSERT_CHUNK at a time, letting Tk repaint in between."""
+        if not tree.winfo_exists(): return
+        for values in rows[:self.LOG_INSERT_CHUNK]: tree.insert("", "end", values=values, tags=tags)
+        if len(rows) > self.LOG_INSERT_CHUNK:
+            self.root.after_idle(self._insert_rows_chunked, tree, rows[self.LOG_INSERT_CHUNK:], tags)
+
     def show_student_attendance_log(self):
         self._display_attendance_log("Student Attendance Log", self.student_attendance_file)
     
@@ -1216,7 +1857,7 @@ class FaceRecognitionApp:
         if not os.path.exists(detail_path):
             messagebox.showinfo("Details Not Found", f"No details file found for user '{folder_name}'.", parent=parent_win); return
         try:
-            with open(detail_path, 'r') as f: details = json.load(f)
+            details = self._load_details(folder_name)
         except (json.JSONDecodeError, IOError) as e:
             messagebox.showerror("Error", f"Could not read details file: {e}", parent=parent_win); return
             
@@ -1230,30 +1871,43 @@ class FaceRecognitionApp:
         for key, value in details.items():
             key_text = key.replace('_', ' ').title()
             if value:
-                ttk.Label(main_frame, text=f"{key_text}:", font=("Segoe UI", 11, "bold")).grid(row=row, column=0, sticky="e", padx=10, pady=5)
-                ttk.Label(main_frame, text=value, font=("Segoe UI", 11), wraplength=400, anchor="w").grid(row=row, column=1, sticky="w", padx=10, pady=5)
+                ttk.Label(main_frame, text=f"{key_text}:", font=self.FONT_FORM_LABEL).grid(row=row, column=0, sticky="e", padx=10, pady=5)
+                ttk.Label(main_frame, text=value, font=self.FONT_FORM_INPUT, wraplength=400, anchor="w").grid(row=row, column=1, sticky="w", padx=10, pady=5)
                 row += 1
                 
         ttk.Separator(main_frame, orient=HORIZONTAL).grid(row=row, columnspan=2, sticky='ew', pady=10); row += 1
-        ttk.Label(main_frame, text="Registered Face Samples:", font=("Segoe UI", 11, "bold")).grid(row=row, column=0, columnspan=2, sticky='w', padx=10); row += 1
+        ttk.Label(main_frame, text="Registered Face Samples:", font=self.FONT_FORM_LABEL).grid(row=row, column=0, columnspan=2, sticky='w', padx=10); row += 1
         
         img_frame = ttk.Frame(main_frame); img_frame.grid(row=row, columnspan=2, pady=10); detail_win.images = []
         try:
             user_image_path = os.path.join(self.db_path, folder_name)
-            image_files = sorted([f for f in os.listdir(user_image_path) if f.endswith('.jpg')], key=lambda x: int(os.path.splitext(x)[0]))
+            # Capture index parsed once per file (e.g. '12.jpg' -> 12) and sorted as plain tuples.
+            with os.scandir(user_image_path) as entries:
+                numbered = sorted((int(entry.name[:-4]), entry.name) for entry in entries if entry.name.endswith('.jpg') and entry.name[:-4].isdigit())
+            image_files = [file_name for _, file_name in numbered]
             if not image_files: ttk.Label(img_frame, text="No images found.").pack()
             
+            # Thumbnails decode on worker threads; the window paints right away with placeholders.
+            thumbnail_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='Thumbnail')
             for i, img_file in enumerate(image_files[:8]):
-                img_path = os.path.join(user_image_path, img_file); img = Image.open(img_path)
-                img.thumbnail((100, 100)); photo = ImageTk.PhotoImage(img)
-                detail_win.images.append(photo)
-                img_label = ttk.Label(img_frame, image=photo, relief="solid"); img_label.grid(row=0, column=i, padx=5, pady=5)
+                img_label = ttk.Label(img_frame, text="Loading...", relief="solid", width=12, anchor='center'); img_label.grid(row=0, column=i, padx=5, pady=5)
+                future = thumbnail_executor.submit(load_thumbnail, os.path.join(user_image_path, img_file), (100, 100))
+                future.add_done_callback(lambda f, label=img_label: self.root.after(0, self._show_thumbnail, detail_win, label, f))
+            thumbnail_executor.shutdown(wait=False)
         except Exception as e: 
             ttk.Label(img_frame, text=f"Error loading images: {e}").pack()
             
         row += 1
         ttk.Button(main_frame, text="Close", command=detail_win.destroy).grid(row=row, columnspan=2, pady=20)
 
+    def _show_thumbnail(self, detail_win, img_label, future):
+        """Runs on the Tk thread: swaps a placeholder label for its decoded thumbnail."""
+        if not img_label.winfo_exists(): return
+        try: img = future.result()
+        except Exception: img_label.config(text="Unreadable"); return
+        photo = ImageTk.PhotoImage(img); detail_win.images.append(photo)
+        img_label.config(image=photo, text="", width=0)
+
     def show_salary_calculator(self, parent_win):
         calc_win = Toplevel(parent_win)
         calc_win.title("Faculty Salary Calculator"); calc_win.geometry("1200x700") 
@@ -1298,35 +1952,35 @@ class FaceRecognitionApp:
             messagebox.showerror("Date Error", "Invalid date format. Please use YYYY-MM-DD.", parent=parent_win); return
 
         try:
-            attendance_df = pd.read_csv(self.faculty_attendance_file)
-            attendance_df['Date'] = pd.to_datetime(attendance_df['Date']).dt.date
-        except (FileNotFoundError, pd.errors.EmptyDataError):
+            attendance_df = self._load_faculty_attendance()
+        except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
             messagebox.showinfo("No Data", "Faculty attendance file is empty or not found.", parent=parent_win); return
 
         faculty_folders = []
-        user_folders = [d for d in os.listdir(self.db_path) if os.path.isdir(os.path.join(self.db_path, d))]
+        with os.scandir(self.db_path) as entries: user_folders = [entry.name for entry in entries if entry.is_dir()]
         for folder in user_folders:
-            detail_path = os.path.join(self.db_path, folder, 'details.json')
-            if os.path.exists(detail_path):
-                try:
-                    with open(detail_path, 'r') as f:
-                        details = json.load(f)
-                        if details.get('user_type') == 'Faculty': faculty_folders.append((folder, details))
-                except (json.JSONDecodeError, IOError): continue
+            try:
+                details = self._load_details(folder)
+                if details.get('user_type') == 'Faculty': faculty_folders.append((folder, details))
+            except (json.JSONDecodeError, IOError): continue
         
         if not faculty_folders:
             messagebox.showinfo("No Faculty", "No faculty members found in the database.", parent=parent_win); return
 
         num_days_in_period = (end_date - start_date).days + 1
         calculated_data = []
+        # Distinct present days for every faculty member in one pass over the log. The period
+        # filter is a single vectorised datetime64 comparison rather than per-object date compares.
+        period_start, period_end = np.datetime64(start_date, 'ns'), np.datetime64(end_date, 'ns')
+        dates = attendance_df['Date'].to_numpy()
+        in_period = attendance_df[(dates >= period_start) & (dates <= period_end)]
+        present_days_by_name = in_period.groupby('Name', observed=True)['Date'].nunique()
 
         for folder, details in faculty_folders:
             name = details.get('name', folder.replace('_', ' ')); dept = details.get('department', 'N/A')
             salary_type = details.get('salary_type')
             
-            mask = (attendance_df['Name'] == name) & (attendance_df['Date'] >= start_date) & (attendance_df['Date'] <= end_date)
-            user_attendance = attendance_df.loc[mask]
-            present_days = len(user_attendance['Date'].unique())
+            present_days = int(present_days_by_name.get(name, 0))
             absent_days = num_days_in_period - present_days
             
             basis, rate_str, deduction, final_salary, remarks = "N/A", "0.00", 0.0, 0.0, "Data missing"
@@ -1353,25 +2007,48 @@ class FaceRecognitionApp:
             except (ValueError, TypeError): remarks = "Invalid salary data in details file."
 
             tree.insert("", "end", values=(name, dept, basis, rate_str, present_days, absent_days, f"{deduction:.2f}", f"{final_salary:.2f}", remarks))
-            calculated_data.append({"name": name, "department": dept, "monthly_salary": monthly_salary_val, "daily_salary": daily_rate_val,
-                                    "total_absents": absent_days, "salary_deducted": deduction, "total_salary": final_salary})
+            calculated_data.append((name, dept, monthly_salary_val, daily_rate_val, absent_days, deduction, final_salary))
         
         self.salary_data_for_export = calculated_data
         if self.salary_data_for_export: export_button.config(state=NORMAL)
 
+    def _load_faculty_attendance(self):
+        """
+        Returns the faculty attendance log with 'Date' as a datetime64 column.
+        The parsed frame is cached by file mtime and only re-read after new entries are logged.
+        """
+        mtime = os.stat(self.faculty_attendance_file).st_mtime_ns
+        if self._faculty_attendance_cache is None or self._faculty_attendance_cache[0] != mtime:
+            attendance_df = read_csv_fast(self.faculty_attendance_file, usecols=['Name', 'Date'], dtype={'Name': 'string'}, parse_dates=['Date'], date_format='%Y-%m-%d')
+            self._faculty_attendance_cache = (mtime, attendance_df)
+        return self._faculty_attendance_cache[1]
+
     def _export_salaries_to_csv(self, parent_win):
         if not self.salary_data_for_export:
             messagebox.showerror("Export Error", "No salary data to export.", parent=parent_win); return
         try:
-            df = pd.DataFrame(self.salary_data_for_export)
-            required_cols = ["name", "department", "monthly_salary", "daily_salary", "total_absents", "salary_deducted", "total_salary"]
-            for col in required_cols:
-                if col not in df.columns: df[col] = 0.0
-            df[required_cols].to_csv(self.salary_file, index=False, float_format='%.2f')
+            df = pd.DataFrame(self.salary_data_for_export, columns=self.SALARY_EXPORT_COLUMNS)
+            df.to_csv(self.salary_file, index=False, float_format='%.2f', lineterminator='\n')
             messagebox.showinfo("Export Successful", f"Salary data has been saved to '{self.salary_file}'.", parent=parent_win)
         except Exception as e:
             messagebox.showerror("Export Failed", f"An error occurred while saving the CSV file:\n{e}", parent=parent_win)
 
+def load_login_background(source_path, screen_size, blur_radius=15):
+    """
+    Returns the blurred, screen-sized login background, or None if there is no source image.
+    The result is cached as a PNG next to the source, keyed by blur radius and screen size, and
+    reused while it is newer than the source, so the resize and blur only run once per screen size.
+    """
+    if not os.path.exists(source_path): return None
+    cache_path = f"{os.path.splitext(source_path)[0]}.blur{blur_radius}.{screen_size[0]}x{screen_size[1]}.png"
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(source_path): return Image.open(cache_path)
+    except OSError: pass
+    img = Image.open(source_path).resize(screen_size, Image.LANCZOS).filter(ImageFilter.GaussianBlur(blur_radius))
+    try: img.save(cache_path, 'PNG', optimize=True)
+    except OSError: pass  # Read-only install folder: just blur on every launch.
+    return img
+
 def login():
     login_win = Toplevel(); login_win.title("User Login"); login_win.attributes('-fullscreen', True)
     BG_COLOR, FORM_BG_COLOR, TEXT_COLOR = "#2C3E50", "#34495E", "#ECF0F1"
@@ -1382,8 +2059,8 @@ def login():
 
     canvas = Canvas(login_win, bg=BG_COLOR, highlightthickness=0); canvas.pack(fill=BOTH, expand=True)
     try:
-        if os.path.exists("background.jpg"):
-            img = Image.open("background.jpg").resize((login_win.winfo_screenwidth(), login_win.winfo_screenheight()), Image.LANCZOS).filter(ImageFilter.GaussianBlur(15))
+        img = load_login_background("background.jpg", (login_win.winfo_screenwidth(), login_win.winfo_screenheight()))
+        if img is not None:
             login_win.bg_photo = ImageTk.PhotoImage(img)
             canvas.create_image(0, 0, image=login_win.bg_photo, anchor="nw")
     except Exception: pass
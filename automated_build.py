@@ -12,7 +12,13 @@ It's designed to be run on Windows and will:
 7. Run validation tests
 
 Usage:
-    python automated_build.py
+    python automated_build.py [--yes] [--onefile] [--deep-verify]
+
+Options:
+    --yes, -y       Start immediately without the confirmation countdown
+    --onefile       Build a single self-extracting .exe instead of a folder
+                    (slower start: it unpacks to a temp dir on every launch)
+    --deep-verify   Verify dependencies by importing them (slower, for diagnostics)
 
 This is a one-command solution for creating the executable.
 """
@@ -20,17 +26,57 @@ This is a one-command solution for creating the executable.
 import sys
 import os
 import subprocess
-import shutil
+import argparse
+import time
+from collections import deque
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from build_common import cached_step, ensure_wheelhouse, remove_trees, list_top_level, nuitka_command
+
+
+def _try_import(module_name):
+    """Import a module in a worker process; return (name, error or None)."""
+    try:
+        __import__(module_name)
+        return module_name, None
+    except ImportError as e:
+        return module_name, str(e)
+
 
 class AutomatedBuilder:
     """Fully automated build manager with comprehensive error handling."""
     
-    def __init__(self):
+    def __init__(self, args=None):
+        self.args = args if args is not None else argparse.Namespace(yes=False, onefile=False, deep_verify=False)
         self.project_root = Path(__file__).parent
+        self.dist_dir = self.project_root / 'dist'
+        self.build_dir = self.project_root / 'build'
+        self.output_dir = self.dist_dir / 'FaceAttendanceSystem_Package'
+        self.models_dir = self.project_root / 'deepface_models'
+        self.archive_path = None
         self.errors = []
         self.warnings = []
+        # Extra pip install args; points at the wheelhouse once it is ready
+        self.pip_source_args = []
+        
+        # Lines of command output kept for error reporting
+        self.OUTPUT_TAIL_LINES = 500
+        self.ERROR_TAIL_LINES = 20
+        
+        # (module, display name, distribution names that provide it)
+        self.REQUIRED_MODULES = [
+            ('cv2', 'OpenCV', ('opencv-python', 'opencv-contrib-python', 'opencv-python-headless')),
+            ('pandas', 'Pandas', ('pandas',)),
+            ('PIL', 'Pillow', ('Pillow',)),
+            ('numpy', 'NumPy', ('numpy',)),
+            ('deepface', 'DeepFace', ('deepface',)),
+            ('tensorflow', 'TensorFlow', ('tensorflow', 'tensorflow-cpu', 'tensorflow-intel')),
+        ]
+        
+        # Seconds to wait for Enter before the build starts on its own
+        self.CONFIRM_TIMEOUT = 10
         
     def print_header(self, text, char='='):
         """Print formatted header."""
@@ -53,22 +99,25 @@ class AutomatedBuilder:
         print(f"$ {' '.join(cmd) if isinstance(cmd, list) else cmd}\n")
         
         try:
-            result = subprocess.run(
+            # Stream output line by line; keep only the tail for error reports
+            tail = deque(maxlen=self.OUTPUT_TAIL_LINES)
+            with subprocess.Popen(
                 cmd,
                 shell=isinstance(cmd, str),
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                check=False
-            )
+                bufsize=1
+            ) as proc:
+                for line in proc.stdout:
+                    sys.stdout.write(line)
+                    tail.append(line)
             
-            # Show output
-            if result.stdout:
-                print(result.stdout)
-            
-            if result.returncode != 0:
-                error_msg = f"Command failed with exit code {result.returncode}"
-                if result.stderr:
-                    error_msg += f"\n{result.stderr}"
+            if proc.returncode != 0:
+                error_msg = f"Command failed with exit code {proc.returncode}"
+                if tail:
+                    # Output was already streamed; repeat just the last lines
+                    error_msg += "\n" + ''.join(list(tail)[-self.ERROR_TAIL_LINES:]).rstrip()
                 
                 if critical:
                     self.errors.append(error_msg)
@@ -115,6 +164,7 @@ class AutomatedBuilder:
             print("  Please install Python 3.8-3.12")
             return False
     
+    @cached_step(inputs=['requirements-build.txt'])
     def install_dependencies(self):
         """Install all required dependencies."""
         self.print_step(2, 10, "Installing Dependencies")
@@ -122,21 +172,48 @@ class AutomatedBuilder:
         print("Installing from requirements-build.txt...")
         print("This may take 5-10 minutes...\n")
         
-        # Upgrade pip first
+        # Install from the local wheelhouse when available (no network I/O)
+        self.pip_source_args = ensure_wheelhouse(self.project_root, 'requirements-build.txt', ['pip', 'tf-keras'])
+        
+        # A single pip process installs everything; only the downloads above run
+        # in parallel. A pip floor, requirements and tf-keras (required for newer TensorFlow)
+        # go in one call so pip starts and resolves only once. No global --upgrade: that
+        # would also upgrade every already-satisfied requirement to its newest release.
+        install_args = ['pip>=23', '-r', 'requirements-build.txt', 'tf-keras']
+        if self.pip_source_args:
+            if self.run_command(
+                [sys.executable, '-m', 'pip', 'install', *self.pip_source_args, *install_args],
+                "Installing all dependencies from the wheelhouse"
+            ):
+                print("\n✓ All dependencies installed")
+                return True
+            # An incomplete wheelhouse must not block the build; use the index from here on
+            self.warnings.append(self.errors.pop())
+            print("Offline install failed, retrying against the package index...\n")
+            self.pip_source_args = []
+        
+        if self.run_command(
+            [sys.executable, '-m', 'pip', 'install', *install_args],
+            "Installing all dependencies"
+        ):
+            print("\n✓ All dependencies installed")
+            return True
+        
+        # Fall back to installing step by step; the batch error becomes a warning
+        self.warnings.append(self.errors.pop())
+        print("Retrying step by step...\n")
         self.run_command(
             [sys.executable, '-m', 'pip', 'install', '--upgrade', 'pip'],
             "Upgrading pip",
             critical=False
         )
         
-        # Install requirements
         if not self.run_command(
             [sys.executable, '-m', 'pip', 'install', '-r', 'requirements-build.txt'],
-            "Installing all dependencies"
+            "Installing requirements"
         ):
             return False
         
-        # Install tf-keras if needed (for TensorFlow 2.20+)
         print("\nInstalling tf-keras (required for newer TensorFlow)...")
         self.run_command(
             [sys.executable, '-m', 'pip', 'install', 'tf-keras'],
@@ -148,25 +225,48 @@ class AutomatedBuilder:
         return True
     
     def verify_imports(self):
-        """Verify all critical imports work."""
+        """Verify all critical packages are installed (metadata lookup only)."""
         self.print_step(3, 10, "Verifying Imports")
         
-        required_modules = [
-            ('cv2', 'OpenCV'),
-            ('pandas', 'Pandas'),
-            ('PIL', 'Pillow'),
-            ('numpy', 'NumPy'),
-            ('deepface', 'DeepFace'),
-            ('tensorflow', 'TensorFlow'),
-        ]
+        # Reading .dist-info metadata avoids loading hundreds of MB of native
+        # libraries; use --deep-verify to actually import the modules
+        all_ok = True
+        for _, display_name, dist_names in self.REQUIRED_MODULES:
+            version = None
+            for dist_name in dist_names:
+                try:
+                    version = metadata.version(dist_name)
+                    break
+                except metadata.PackageNotFoundError:
+                    continue
+            if version is not None:
+                print(f"  ✓ {display_name} {version}")
+            else:
+                print(f"  ✗ {display_name}: not installed ({' / '.join(dist_names)})")
+                self.errors.append(f"{display_name} is not installed")
+                all_ok = False
+        
+        if all_ok:
+            print("\n✓ All packages verified")
+        return all_ok
+    
+    def deep_verify_imports(self):
+        """Verify all critical imports work by importing each module."""
+        self.print_step(3, 10, "Verifying Imports (deep)")
+        
+        required_modules = [(m, d) for m, d, _ in self.REQUIRED_MODULES]
+        
+        # Each import runs in its own process, so the heavy native loads
+        # overlap and TensorFlow never lands in the builder's memory
+        with ProcessPoolExecutor(max_workers=len(required_modules)) as executor:
+            results = list(executor.map(_try_import, [m for m, _ in required_modules]))
         
         all_ok = True
-        for module_name, display_name in required_modules:
-            try:
-                __import__(module_name)
+        for (_, display_name), (_, error) in zip(required_modules, results):
+            if error is None:
                 print(f"  ✓ {display_name}")
-            except ImportError as e:
-                print(f"  ✗ {display_name}: {e}")
+            else:
+                print(f"  ✗ {display_name}: {error}")
                 self.errors.append(f"Failed to import {display_name}")
                 all_ok = False
         
@@ -174,6 +274,8 @@ class AutomatedBuilder:
             print("\n✓ All imports verified")
         return all_ok
     
+    @cached_step(inputs=['copy_opencv_cascade.py', 'requirements-build.txt'],
+                 outputs=['haarcascade_frontalface_alt2.xml'])
     def copy_opencv_cascade(self):
         """Copy OpenCV cascade file to project."""
         self.print_step(4, 10, "Preparing OpenCV Cascade")
@@ -183,6 +285,8 @@ class AutomatedBuilder:
             "Copying cascade file from OpenCV installation"
         )
     
+    @cached_step(inputs=['prepare_models.py', 'requirements-build.txt'],
+                 outputs=['deepface_models/MODELS_READY.txt'])
     def prepare_models(self):
         """Download and prepare AI models."""
         self.print_step(5, 10, "Preparing AI Models")
@@ -199,7 +303,7 @@ class AutomatedBuilder:
         """Verify models are ready."""
         self.print_step(6, 10, "Verifying Models")
         
-        models_dir = self.project_root / 'deepface_models'
+        models_dir = self.models_dir
         marker_file = models_dir / 'MODELS_READY.txt'
         
         if marker_file.exists():
@@ -219,13 +323,12 @@ class AutomatedBuilder:
         """Clean previous build artifacts."""
         self.print_step(7, 10, "Cleaning Build Directories")
         
-        dirs_to_clean = ['dist', 'build']
+        dirs_to_clean = [self.dist_dir, self.build_dir]
         
-        for dir_name in dirs_to_clean:
-            dir_path = self.project_root / dir_name
+        for dir_path in dirs_to_clean:
             if dir_path.exists():
                 print(f"  Removing {dir_path}")
-                shutil.rmtree(dir_path)
+        remove_trees(dirs_to_clean)
         
         print("\n✓ Build directories cleaned")
         return True
@@ -234,39 +337,10 @@ class AutomatedBuilder:
         """Build executable with Nuitka."""
         self.print_step(8, 10, "Building Executable with Nuitka")
         
-        print("Building standalone executable...")
+        print(f"Building {'single-file' if self.args.onefile else 'standalone folder'} executable...")
         print("This will take 10-20 minutes. Please be patient...\n")
         
-        # Build command
-        cmd = [
-            sys.executable, '-m', 'nuitka',
-            '--standalone',
-            '--onefile',
-            '--enable-plugin=tk-inter',
-            '--enable-plugin=numpy',
-            '--nofollow-import-to=matplotlib',
-            '--nofollow-import-to=IPython',
-            f'--include-data-dir=deepface_models=deepface_models',
-            f'--include-data-file=haarcascade_frontalface_alt2.xml=haarcascade_frontalface_alt2.xml',
-        ]
-        
-        # Add icon if exists
-        icon_file = self.project_root / 'icon.ico'
-        if icon_file.exists():
-            cmd.append(f'--windows-icon-from-ico={icon_file}')
-        
-        # Add optional resources
-        for resource in ['send_button.png', 'background.jpg']:
-            resource_file = self.project_root / resource
-            if resource_file.exists():
-                cmd.append(f'--include-data-file={resource}={resource}')
-        
-        # Windows specific options
-        if sys.platform == 'win32':
-            cmd.append('--windows-disable-console')
-        
-        # Output directory
-        cmd.extend(['--output-dir=dist', 'app_launcher.py'])
+        cmd = nuitka_command(self.project_root, onefile=self.args.onefile)
         
         return self.run_command(cmd, "Compiling with Nuitka")
     
@@ -274,11 +348,20 @@ class AutomatedBuilder:
         """Create distribution package."""
         self.print_step(9, 10, "Creating Distribution Package")
         
-        # Use the build.py package creation logic
-        return self.run_command(
-            [sys.executable, 'build.py', '--skip-models', '--skip-tests'],
-            "Creating package structure"
-        )
+        # Reuse build.py's packaging directly instead of spawning it (which also
+        # re-ran dependency install and Nuitka); imported lazily as it is
+        # only needed for this step
+        from build import BuildManager
+        
+        args = argparse.Namespace(full=False, clean=False, skip_models=True,
+                                  skip_tests=True, onefile=self.args.onefile)
+        manager = BuildManager(args)
+        if not (manager.create_package_structure() and manager.create_build_info()):
+            self.errors.append("Failed to create package structure")
+            return False
+        manager.create_archive()
+        self.archive_path = manager.archive_path
+        return True
     
     def run_tests(self):
         """Run validation tests."""
@@ -315,22 +398,22 @@ class AutomatedBuilder:
                 print()
             
             # Show output location
-            output_dir = self.project_root / 'dist' / 'FaceAttendanceSystem_Package'
+            output_dir = self.output_dir
             if output_dir.exists():
                 exe_path = output_dir / 'FaceAttendanceSystem.exe'
                 print(f"Executable ready: {exe_path}")
                 print(f"Package ready: {output_dir}")
                 
-                # Show package contents
+                # Show package contents; folders (e.g. standalone builds with
+                # thousands of files) are listed once with their total size
+                entries = list_top_level(output_dir)
                 print("\nPackage contents:")
-                for item in sorted(output_dir.rglob('*')):
-                    if item.is_file():
-                        size_mb = item.stat().st_size / 1024 / 1024
-                        rel_path = item.relative_to(output_dir)
-                        print(f"  {rel_path} ({size_mb:.1f} MB)")
+                for name, size, is_dir in entries:
+                    suffix = os.sep if is_dir else ''
+                    print(f"  {name}{suffix} ({size / 1024 / 1024:.1f} MB)")
                 
                 # Calculate total size
-                total_size = sum(f.stat().st_size for f in output_dir.rglob('*') if f.is_file())
+                total_size = sum(size for _, size, _ in entries)
                 print(f"\nTotal package size: {total_size / 1024 / 1024:.1f} MB")
                 
                 print("\n" + "="*80)
@@ -340,17 +423,47 @@ class AutomatedBuilder:
                 print(f"   cd {output_dir}")
                 print("   FaceAttendanceSystem.exe")
                 print("\n2. The application will:")
-                print("   - Start automatically (10-15 seconds first time)")
+                if self.args.onefile:
+                    print("   - Start automatically (10-15 seconds first time)")
+                else:
+                    print("   - Start automatically (no unpacking step)")
                 print("   - Load AI models")
                 print("   - Show login screen")
                 print("   - Default credentials: admin/admin123 or user/user123")
                 print("\n3. Distribute:")
-                print("   - ZIP the FaceAttendanceSystem_Package folder")
+                if self.archive_path is not None:
+                    print(f"   - Share {self.archive_path.name} (already compressed)")
+                else:
+                    print("   - ZIP the FaceAttendanceSystem_Package folder")
                 print("   - Share with users")
                 print("   - Users just extract and run the .exe")
             
             return True
     
+    def run_concurrent_steps(self, step_funcs):
+        """Run independent steps in parallel and return the ones that failed."""
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(step_funcs)) as executor:
+            futures = {executor.submit(func): func for func in step_funcs}
+            for future in as_completed(futures):
+                if not future.result():
+                    failed.append(futures[future])
+        return failed
+    
+    def wait_for_confirmation(self, timeout):
+        """Wait until Enter is pressed or the timeout expires."""
+        if sys.platform == 'win32':
+            import msvcrt
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if msvcrt.kbhit() and msvcrt.getwch() in '\r\n':
+                    return
+                time.sleep(0.1)
+        else:
+            import select
+            if sys.stdin in select.select([sys.stdin], [], [], timeout)[0]:
+                sys.stdin.readline()
+    
     def build(self):
         """Execute full automated build process."""
         self.print_header("AUTOMATED BUILD - FACE RECOGNITION ATTENDANCE SYSTEM")
@@ -367,31 +480,36 @@ class AutomatedBuilder:
         print("  9. Create distribution package")
         print("  10. Run validation tests")
         print("\nTotal estimated time: 20-40 minutes")
-        print("\nPress Ctrl+C to cancel, or Enter to continue...")
         
-        try:
-            input()
-        except KeyboardInterrupt:
-            print("\n\nBuild cancelled by user.")
-            return False
+        if not self.args.yes:
+            print(f"\nPress Ctrl+C to cancel, or Enter to continue "
+                  f"(continuing automatically in {self.CONFIRM_TIMEOUT}s)...")
+            try:
+                self.wait_for_confirmation(self.CONFIRM_TIMEOUT)
+            except KeyboardInterrupt:
+                print("\n\nBuild cancelled by user.")
+                return False
         
-        # Execute all steps
+        # Execute all steps; a tuple is a group of independent steps that
+        # run concurrently (model download overlaps cascade copy and cleanup)
         steps = [
             self.check_python_version,
             self.install_dependencies,
-            self.verify_imports,
-            self.copy_opencv_cascade,
-            self.prepare_models,
+            self.deep_verify_imports if self.args.deep_verify else self.verify_imports,
+            (self.copy_opencv_cascade, self.prepare_models, self.clean_build_dirs),
             self.verify_models,
-            self.clean_build_dirs,
             self.build_with_nuitka,
             self.create_package,
             self.run_tests,
         ]
         
-        for step_func in steps:
-            if not step_func():
-                print(f"\n❌ Build failed at: {step_func.__name__}")
+        for step in steps:
+            if isinstance(step, tuple):
+                failed = self.run_concurrent_steps(step)
+            else:
+                failed = [] if step() else [step]
+            if failed:
+                print(f"\n❌ Build failed at: {', '.join(f.__name__ for f in failed)}")
                 self.print_summary()
                 return False
         
@@ -400,7 +518,18 @@ class AutomatedBuilder:
 
 def main():
     """Main entry point."""
-    builder = AutomatedBuilder()
+    parser = argparse.ArgumentParser(
+        description='Fully automated build of the Face Recognition Attendance System'
+    )
+    parser.add_argument('--yes', '-y', action='store_true',
+                       help='Start immediately without the confirmation countdown')
+    parser.add_argument('--onefile', action='store_true',
+                       help='Build a single self-extracting .exe instead of a folder')
+    parser.add_argument('--deep-verify', action='store_true',
+                       help='Verify dependencies by importing them instead of reading package metadata')
+    args = parser.parse_args()
+    
+    builder = AutomatedBuilder(args)
     
     try:
         success = builder.build()
@@ -24,9 +24,102 @@ import sys
 import shutil
 import subprocess
 import argparse
+import json
 from pathlib import Path
 from datetime import datetime
 
+from build_common import (cached_step, ensure_wheelhouse, remove_trees, remove_path,
+                          copy_if_changed, sync_tree, archive_package, list_top_level,
+                          nuitka_command)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# README.txt shipped in the package; %b is replaced with the build date
+_README_TEMPLATE = b"""Face Recognition Attendance System
+============================================================
+
+Version: 1.0.0
+Build Date: %b
+
+SYSTEM REQUIREMENTS
+-------------------
+- Windows 10 or Windows 11
+- Webcam (for face recognition)
+- 4GB RAM minimum (8GB recommended)
+- 2GB free disk space
+
+INSTALLATION
+------------
+1. Extract all files to a folder on your computer
+   (FaceAttendanceSystem_Package.tar.zst opens with 7-Zip or
+   Windows 11's built-in archive support; .zip opens anywhere)
+2. Run FaceAttendanceSystem.exe
+3. Default login credentials:
+   - Admin: username=admin, password=admin123
+   - User:  username=user,  password=user123
+
+FIRST TIME SETUP
+----------------
+1. Launch the application
+2. Login with admin credentials
+3. Register users using the "Register New User" button
+4. Follow the on-screen instructions to capture faces
+
+FEATURES
+--------
+- Real-time face recognition
+- Student and Faculty attendance tracking
+- Automated WhatsApp notifications for absentees
+- Salary calculation for faculty
+- Attendance reports and logs
+
+DATA LOCATION
+-------------
+All data (face database, attendance logs) is stored in:
+Windows: C:\\Users\\<YourUsername>\\AppData\\Local\\FaceAttendanceSystem\\
+
+TROUBLESHOOTING
+---------------
+1. If the application doesn't start:
+   - Check Windows Event Viewer for errors
+   - Run as Administrator
+   - Disable antivirus temporarily
+
+2. If camera doesn't work:
+   - Check camera permissions in Windows Settings
+   - Ensure no other application is using the camera
+
+3. If face recognition is slow:
+   - Close other applications
+   - Ensure good lighting
+   - Move closer to the camera
+
+4. Display scaling issues:
+   - Set Windows display scaling to 100%%
+   - Or set DPI awareness in app properties
+
+SUPPORT
+-------
+For issues and questions, please visit:
+https://github.com/DaniyalFaheem/Face
+
+CREDITS
+-------
+- DeepFace: Face recognition framework
+- OpenCV: Computer vision library
+- TensorFlow: Machine learning framework
+
+LICENSE
+-------
+See LICENSE.txt for terms and conditions.
+
+============================================================
+"""
+
 
 class BuildManager:
     """Manages the build process."""
@@ -37,6 +130,16 @@ class BuildManager:
         self.dist_dir = self.project_root / 'dist'
         self.build_dir = self.project_root / 'build'
         self.output_dir = self.dist_dir / 'FaceAttendanceSystem_Package'
+        self.exe_dest = self.output_dir / 'FaceAttendanceSystem.exe'
+        self.archive_path = None
+        self.models_dir = self.project_root / 'deepface_models'
+        self.requirements_file = self.project_root / 'requirements-build.txt'
+        self.quickstart_file = self.project_root / 'QUICKSTART.txt'
+        self.user_guide_file = self.project_root / 'USER_GUIDE.md'
+        self.license_file = self.project_root / 'LICENSE'
+        self.resource_files = [self.project_root / r for r in ('send_button.png', 'background.jpg')]
+        # Extra pip install args; points at the wheelhouse once it is ready
+        self.pip_source_args = []
         
     def print_header(self, text):
         """Print a formatted header."""
@@ -72,29 +175,31 @@ class BuildManager:
     
     def clean_build_dirs(self):
         """Clean build and dist directories."""
-        self.step(1, 8, "Cleaning build directories")
+        self.step(1, 9, "Cleaning build directories")
         
         dirs_to_clean = [self.dist_dir, self.build_dir]
         
-        for dir_path in dirs_to_clean:
-            if dir_path.exists():
-                print(f"  Removing {dir_path}")
-                shutil.rmtree(dir_path)
-                print(f"  ✓ Removed {dir_path}")
+        existing = [d for d in dirs_to_clean if d.exists()]
+        for dir_path in existing:
+            print(f"  Removing {dir_path}")
+        remove_trees(existing)
+        for dir_path in existing:
+            print(f"  ✓ Removed {dir_path}")
         
         print("\n✓ Build directories cleaned")
         return True
     
+    @cached_step(inputs=['prepare_models.py', 'requirements-build.txt'],
+                 outputs=['deepface_models/MODELS_READY.txt'])
     def prepare_models(self):
         """Prepare DeepFace models."""
-        self.step(2, 8, "Preparing DeepFace models")
+        self.step(2, 9, "Preparing DeepFace models")
         
         if self.args.skip_models:
             print("⚠ Skipping model preparation (--skip-models)")
             
             # Check if models exist
-            models_dir = self.project_root / 'deepface_models'
-            if models_dir.exists():
+            if self.models_dir.exists():
                 print("✓ Using existing models")
                 return True
             else:
@@ -107,16 +212,29 @@ class BuildManager:
             "Running model preparation script"
         )
     
+    @cached_step(inputs=['requirements-build.txt'])
     def install_dependencies(self):
         """Install build dependencies."""
-        self.step(3, 8, "Installing build dependencies")
+        self.step(3, 9, "Installing build dependencies")
         
         # Check if requirements-build.txt exists
-        req_file = self.project_root / 'requirements-build.txt'
-        if not req_file.exists():
+        if not self.requirements_file.exists():
             print("⚠ requirements-build.txt not found, skipping")
             return True
         
+        # Install from the local wheelhouse when available (no network I/O); the
+        # wheelhouse is downloaded in parallel, the install is one pip process
+        self.pip_source_args = ensure_wheelhouse(self.project_root, 'requirements-build.txt')
+        
+        if self.pip_source_args and self.run_command(
+            [sys.executable, '-m', 'pip', 'install', *self.pip_source_args, '-r', 'requirements-build.txt'],
+            "Installing from the wheelhouse"
+        ):
+            return True
+        if self.pip_source_args:
+            print("⚠ Offline install failed, retrying against the package index")
+            self.pip_source_args = []
+        
         return self.run_command(
             [sys.executable, '-m', 'pip', 'install', '-r', 'requirements-build.txt'],
             "Installing from requirements-build.txt"
@@ -124,28 +242,9 @@ class BuildManager:
     
     def build_with_nuitka(self):
         """Build the application with Nuitka."""
-        self.step(4, 8, "Building with Nuitka")
-        
-        # Nuitka command
-        cmd = [
-            sys.executable, '-m', 'nuitka',
-            '--standalone',
-            '--onefile' if self.args.onefile else '',
-            '--enable-plugin=tk-inter',
-            '--enable-plugin=numpy',
-            '--nofollow-import-to=matplotlib',
-            '--nofollow-import-to=IPython',
-            '--include-data-dir=deepface_models=deepface_models',
-            '--include-data-file=haarcascade_frontalface_alt2.xml=haarcascade_frontalface_alt2.xml',
-            '--include-data-file=send_button.png=send_button.png',
-            '--windows-disable-console',
-            '--windows-icon-from-ico=icon.ico' if (self.project_root / 'icon.ico').exists() else '',
-            '--output-dir=dist',
-            'app_launcher.py'
-        ]
+        self.step(4, 9, "Building with Nuitka")
         
-        # Remove empty strings
-        cmd = [c for c in cmd if c]
+        cmd = nuitka_command(self.project_root, onefile=self.args.onefile)
         
         print("Building executable (this may take 10-20 minutes)...")
         print("Command:", ' '.join(cmd))
@@ -159,7 +258,7 @@ class BuildManager:
     
     def create_package_structure(self):
         """Create the final package structure."""
-        self.step(5, 8, "Creating package structure")
+        self.step(5, 9, "Creating package structure")
         
         # Create output directory
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -177,15 +276,22 @@ class BuildManager:
             return False
         
         # Copy executable
-        exe_dest = self.output_dir / 'FaceAttendanceSystem.exe'
+        exe_dest = self.exe_dest
         if self.args.onefile:
-            shutil.copy2(exe_src, exe_dest)
-            print(f"  ✓ Copied executable: {exe_dest}")
+            if exe_dest.is_dir():
+                remove_path(exe_dest)
+            if copy_if_changed(exe_src, exe_dest):
+                print(f"  ✓ Copied executable: {exe_dest}")
+            else:
+                print(f"  ✓ Executable unchanged: {exe_dest}")
         else:
-            if exe_dest.exists():
-                shutil.rmtree(exe_dest)
-            shutil.copytree(exe_src, exe_dest)
-            print(f"  ✓ Copied executable directory: {exe_dest}")
+            # Standalone build: the dist folder becomes the package itself, so
+            # nothing has to be unpacked to a temp dir on each launch
+            if exe_dest.is_dir():
+                remove_path(exe_dest)
+            copied = sync_tree(exe_src, self.output_dir, prune_root=False,
+                               rename={'app_launcher.exe': exe_dest.name})
+            print(f"  ✓ Synced standalone build into {self.output_dir} ({copied} files updated)")
         
         # Create face_database directory
         db_dir = self.output_dir / 'face_database'
@@ -198,124 +304,40 @@ class BuildManager:
         print(f"  ✓ Created: {readme_path}")
         
         # Copy QUICKSTART.txt if exists
-        quickstart_src = self.project_root / 'QUICKSTART.txt'
-        if quickstart_src.exists():
+        if self.quickstart_file.exists():
             quickstart_dest = self.output_dir / 'QUICKSTART.txt'
-            shutil.copy2(quickstart_src, quickstart_dest)
+            copy_if_changed(self.quickstart_file, quickstart_dest)
             print(f"  ✓ Copied: {quickstart_dest}")
         
         # Copy USER_GUIDE.md if exists
-        userguide_src = self.project_root / 'USER_GUIDE.md'
-        if userguide_src.exists():
+        if self.user_guide_file.exists():
             userguide_dest = self.output_dir / 'USER_GUIDE.md'
-            shutil.copy2(userguide_src, userguide_dest)
+            copy_if_changed(self.user_guide_file, userguide_dest)
             print(f"  ✓ Copied: {userguide_dest}")
         
         # Copy LICENSE if exists
-        license_src = self.project_root / 'LICENSE'
-        if license_src.exists():
+        if self.license_file.exists():
             license_dest = self.output_dir / 'LICENSE.txt'
-            shutil.copy2(license_src, license_dest)
+            copy_if_changed(self.license_file, license_dest)
             print(f"  ✓ Copied: {license_dest}")
         
         # Copy additional resources if they exist
-        resources = ['send_button.png', 'background.jpg']
-        for resource in resources:
-            resource_src = self.project_root / resource
+        for resource_src in self.resource_files:
             if resource_src.exists():
-                resource_dest = self.output_dir / resource
-                shutil.copy2(resource_src, resource_dest)
-                print(f"  ✓ Copied: {resource}")
+                copy_if_changed(resource_src, self.output_dir / resource_src.name)
+                print(f"  ✓ Copied: {resource_src.name}")
         
         print("\n✓ Package structure created")
         return True
     
     def create_readme(self, path):
         """Create README.txt file."""
-        readme_content = f"""Face Recognition Attendance System
-{'=' * 60}
-
-Version: 1.0.0
-Build Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-SYSTEM REQUIREMENTS
--------------------
-- Windows 10 or Windows 11
-- Webcam (for face recognition)
-- 4GB RAM minimum (8GB recommended)
-- 2GB free disk space
-
-INSTALLATION
-------------
-1. Extract all files to a folder on your computer
-2. Run FaceAttendanceSystem.exe
-3. Default login credentials:
-   - Admin: username=admin, password=admin123
-   - User:  username=user,  password=user123
-
-FIRST TIME SETUP
-----------------
-1. Launch the application
-2. Login with admin credentials
-3. Register users using the "Register New User" button
-4. Follow the on-screen instructions to capture faces
-
-FEATURES
---------
-- Real-time face recognition
-- Student and Faculty attendance tracking
-- Automated WhatsApp notifications for absentees
-- Salary calculation for faculty
-- Attendance reports and logs
-
-DATA LOCATION
--------------
-All data (face database, attendance logs) is stored in:
-Windows: C:\\Users\\<YourUsername>\\AppData\\Local\\FaceAttendanceSystem\\
-
-TROUBLESHOOTING
----------------
-1. If the application doesn't start:
-   - Check Windows Event Viewer for errors
-   - Run as Administrator
-   - Disable antivirus temporarily
-
-2. If camera doesn't work:
-   - Check camera permissions in Windows Settings
-   - Ensure no other application is using the camera
-
-3. If face recognition is slow:
-   - Close other applications
-   - Ensure good lighting
-   - Move closer to the camera
-
-4. Display scaling issues:
-   - Set Windows display scaling to 100%
-   - Or set DPI awareness in app properties
-
-SUPPORT
--------
-For issues and questions, please visit:
-https://github.com/DaniyalFaheem/Face
-
-CREDITS
--------
-- DeepFace: Face recognition framework
-- OpenCV: Computer vision library
-- TensorFlow: Machine learning framework
-
-LICENSE
--------
-See LICENSE.txt for terms and conditions.
-
-{'=' * 60}
-"""
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(readme_content)
+        build_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        path.write_bytes(_README_TEMPLATE % build_date.encode())
     
     def run_validation_tests(self):
         """Run validation tests."""
-        self.step(6, 8, "Running validation tests")
+        self.step(6, 9, "Running validation tests")
         
         if self.args.skip_tests:
             print("⚠ Skipping validation tests (--skip-tests)")
@@ -339,47 +361,66 @@ See LICENSE.txt for terms and conditions.
     
     def create_build_info(self):
         """Create build information file."""
-        self.step(7, 8, "Creating build information")
+        self.step(7, 9, "Creating build information")
         
         build_info = {
             'build_date': datetime.now().isoformat(),
             'python_version': sys.version,
             'platform': sys.platform,
             'onefile': self.args.onefile,
-            'models_included': (self.project_root / 'deepface_models').exists(),
+            'models_included': self.models_dir.exists(),
         }
         
-        import json
         info_file = self.output_dir / 'build_info.json'
-        with open(info_file, 'w') as f:
-            json.dump(build_info, f, indent=2)
+        if orjson is not None:
+            info_file.write_bytes(orjson.dumps(build_info, option=orjson.OPT_INDENT_2))
+        else:
+            info_file.write_text(json.dumps(build_info, indent=2), encoding='utf-8')
         
         print(f"  ✓ Created: {info_file}")
         print("\n✓ Build information created")
         return True
     
+    def create_archive(self):
+        """Compress the package for distribution."""
+        self.step(8, 9, "Creating distribution archive")
+        
+        try:
+            self.archive_path = archive_package(self.output_dir)
+        except Exception as e:
+            # The package folder is still usable, so don't fail the build
+            print(f"⚠ Could not create archive: {e}")
+            return True
+        
+        size_mb = self.archive_path.stat().st_size / 1024 / 1024
+        print(f"  ✓ Created: {self.archive_path} ({size_mb:.1f} MB)")
+        return True
+    
     def print_summary(self):
         """Print build summary."""
-        self.step(8, 8, "Build Summary")
+        self.step(9, 9, "Build Summary")
         
         print(f"Output directory: {self.output_dir}")
         print(f"\nPackage contents:")
         
-        for item in sorted(self.output_dir.rglob('*')):
-            if item.is_file():
-                size = item.stat().st_size
-                rel_path = item.relative_to(self.output_dir)
-                print(f"  {rel_path} ({size / 1024 / 1024:.2f} MB)")
+        # Folders (e.g. standalone builds with thousands of files) are listed
+        # once with their total size
+        entries = list_top_level(self.output_dir)
+        for name, size, is_dir in entries:
+            suffix = os.sep if is_dir else ''
+            print(f"  {name}{suffix} ({size / 1024 / 1024:.2f} MB)")
         
         # Calculate total size
-        total_size = sum(f.stat().st_size for f in self.output_dir.rglob('*') if f.is_file())
+        total_size = sum(size for _, size, _ in entries)
         print(f"\nTotal package size: {total_size / 1024 / 1024:.2f} MB")
         
         print("\n" + "=" * 80)
         print("BUILD COMPLETED SUCCESSFULLY".center(80))
         print("=" * 80)
-        print(f"\n✓ Executable ready: {self.output_dir / 'FaceAttendanceSystem.exe'}")
+        print(f"\n✓ Executable ready: {self.exe_dest}")
         print(f"✓ Package ready: {self.output_dir}")
+        if self.archive_path is not None:
+            print(f"✓ Archive ready: {self.archive_path}")
         print("\nNext steps:")
         print("  1. Test the executable")
         print("  2. Create installer (optional)")
@@ -403,6 +444,7 @@ See LICENSE.txt for terms and conditions.
             (self.create_package_structure, True),
             (self.run_validation_tests, True),
             (self.create_build_info, True),
+            (self.create_archive, True),
             (self.print_summary, True),
         ]
         
@@ -0,0 +1,394 @@
+"""
+build_common.py - Helpers shared by build.py and automated_build.py
+
+Covers the pieces both build scripts need: step caching, dependency
+installation (wheelhouse filled by parallel pip downloads), directory cleanup, incremental
+copies, package size reporting and the Nuitka command line.
+
+Only the standard library is imported here, so the build scripts start fast.
+"""
+
+import os
+import sys
+import shutil
+import stat
+import hashlib
+import mmap
+import functools
+import subprocess
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# Stamp files written by cached_step live under this project-relative folder
+BUILD_CACHE_DIR = '.build_cache'
+
+# Local wheel cache so repeat builds install without network access
+WHEELHOUSE_DIR = '.wheelhouse'
+
+
+# --- STEP CACHING ---
+
+def hash_inputs(root, inputs):
+    """Hash the interpreter/environment and the contents of the given input files.
+
+    sys.prefix and sys.executable are included so switching virtualenvs (same
+    Python version, different site-packages) invalidates cached steps. Files are
+    memory-mapped straight into BLAKE2b, so no copy of their contents is read
+    into Python.
+    """
+    digest = hashlib.blake2b(sys.version.encode(), digest_size=16)
+    digest.update(sys.prefix.encode())
+    digest.update(sys.executable.encode())
+    for name in inputs:
+        path = root / name
+        digest.update(name.encode())
+        if path.exists():
+            with open(path, 'rb') as f:
+                # mmap cannot map empty files
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        digest.update(mm)
+    return digest.hexdigest()
+
+
+def cached_step(inputs=(), outputs=()):
+    """Skip a build step whose inputs are unchanged since its last success.
+
+    The hash is stored in .build_cache/<step>.stamp; all outputs must still
+    exist for the cached result to count. Delete .build_cache to force reruns.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stamp = self.project_root / BUILD_CACHE_DIR / f'{method.__name__}.stamp'
+            digest = hash_inputs(self.project_root, inputs)
+            if (stamp.exists() and stamp.read_text() == digest
+                    and all((self.project_root / o).exists() for o in outputs)):
+                print(f"✓ {method.__name__}: cached (inputs unchanged)")
+                return True
+            result = method(self, *args, **kwargs)
+            if result:
+                stamp.parent.mkdir(exist_ok=True)
+                stamp.write_text(digest)
+            return result
+        return wrapper
+    return decorator
+
+
+# --- DEPENDENCY INSTALLATION ---
+
+def ensure_wheelhouse(project_root, req_file, extra_packages=()):
+    """Build wheels into .wheelhouse once per requirements/Python environment.
+
+    'pip wheel' is used rather than 'pip download' so sdist-only packages
+    (pyautogui, ...) are stored as built wheels; an offline install never has
+    to build anything. Returns the pip arguments that install offline from the
+    wheelhouse, or an empty list when a wheel could not be built and pip should
+    use the package index. The hash is only written after every group succeeded.
+    """
+    wheelhouse = project_root / WHEELHOUSE_DIR
+    offline_args = ['--no-index', '--find-links', str(wheelhouse)]
+    hash_file = wheelhouse / '.hash'
+    digest = hash_inputs(project_root, [req_file]) + ' '.join(extra_packages)
+    if hash_file.exists() and hash_file.read_text() == digest:
+        print(f"✓ Using cached wheelhouse: {wheelhouse}")
+        return offline_args
+
+    # Requirements changed (or first run): rebuild the wheelhouse
+    if wheelhouse.exists():
+        shutil.rmtree(wheelhouse, onerror=_on_rm_error)
+    wheelhouse.mkdir(parents=True)
+    print(f"Building wheels in {wheelhouse}...")
+    if not _download_requirements_parallel(project_root / req_file, extra_packages, wheelhouse):
+        print("⚠ Wheelhouse build failed, installing from the package index")
+        return []
+
+    hash_file.write_text(digest)
+    return offline_args
+
+
+def _read_requirements(req_path):
+    """Return the requirement specifiers in a requirements file, minus comments."""
+    lines = []
+    with open(req_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                lines.append(line)
+    return lines
+
+
+def _download_requirements_parallel(req_path, extra_packages, wheelhouse):
+    """Fetch and build requirement groups with concurrent 'pip wheel' processes.
+
+    Only wheel building runs in parallel: each group gets a private directory that is
+    merged into the wheelhouse afterwards, and the install itself stays a
+    single pip process so nothing writes to site-packages concurrently.
+    """
+    requirements = _read_requirements(req_path) + list(extra_packages)
+    workers = max(1, min(4, os.cpu_count() or 1, len(requirements)))
+    groups = [requirements[i::workers] for i in range(workers)]
+    if len(groups) > 1:
+        print(f"→ Building wheels in {len(groups)} parallel groups")
+
+    def download(group):
+        dest = tempfile.mkdtemp(prefix='wheel_group_', dir=wheelhouse)
+        result = subprocess.run(
+            [sys.executable, '-m', 'pip', 'wheel', '--wheel-dir', dest, *group],
+            capture_output=True, text=True, check=False
+        )
+        return dest, result
+
+    with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+        results = list(executor.map(download, groups))
+
+    all_ok = True
+    for i, (dest, result) in enumerate(results, 1):
+        if result.returncode != 0:
+            all_ok = False
+            print(f"  ⚠ Group {i} failed (exit code {result.returncode})")
+            print(result.stderr[-2000:].rstrip())
+        else:
+            print(f"  ✓ Group {i} built")
+        # Shared dependencies (numpy, ...) arrive in several groups; keep one copy
+        for entry in os.scandir(dest):
+            target = wheelhouse / entry.name
+            if not target.exists():
+                os.replace(entry.path, target)
+        shutil.rmtree(dest, onerror=_on_rm_error)
+    print()
+    return all_ok
+
+
+# --- FILESYSTEM ---
+
+def _on_rm_error(func, path, exc_info):
+    """Clear the read-only bit (common on Windows build output) and retry."""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def remove_path(path):
+    """Remove a file or directory tree, retrying read-only entries."""
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, onerror=_on_rm_error)
+    else:
+        try:
+            path.unlink()
+        except PermissionError:
+            _on_rm_error(os.unlink, path, None)
+
+
+def remove_trees(dirs, workers=8):
+    """Delete directories by removing all their top-level children concurrently."""
+    dirs = [d for d in dirs if d.exists()]
+    children = [c for d in dirs for c in d.iterdir()]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(remove_path, children))
+    for d in dirs:
+        os.rmdir(d)
+
+
+def fast_copy(src, dst):
+    """Copy a file with the kernel's copy primitive, then copy its metadata like copy2.
+
+    Uses CopyFileExW on Windows and copy_file_range on Linux so large files
+    (the onefile executable is 200MB+) never pass through Python buffers.
+    """
+    src, dst = str(src), str(dst)
+    if sys.platform == 'win32':
+        import ctypes
+        if ctypes.windll.kernel32.CopyFileExW(src, dst, None, None, None, 0):
+            shutil.copystat(src, dst)
+            return
+    elif hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def copy_if_changed(src, dst):
+    """Copy src to dst unless dst already matches by size and mtime.
+
+    The copy preserves mtimes, so an unchanged source keeps matching on reruns.
+    Returns True when the file was copied.
+    """
+    src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+        if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime >= src_stat.st_mtime:
+            return False
+    except FileNotFoundError:
+        pass
+    fast_copy(src, dst)
+    return True
+
+
+def sync_tree(src, dst, rename=None, prune_root=True, workers=None):
+    """Mirror src into dst, copying only changed files and dropping stale ones.
+
+    rename maps top-level file names in src to new names in dst. With
+    prune_root=False, extra entries directly in dst (e.g. package files added
+    next to a standalone build) are left alone. File copies run on a thread
+    pool since they are I/O bound (thousands of small files on Windows).
+    Returns the number of files copied.
+    """
+    rename = rename or {}
+    if dst.exists() and not dst.is_dir():
+        dst.unlink()
+    jobs = []
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = os.path.relpath(dirpath, src)
+        at_root = rel == '.'
+        target = dst if at_root else dst / rel
+        target.mkdir(parents=True, exist_ok=True)
+        names = {n: rename.get(n, n) if at_root else n for n in filenames}
+
+        # Remove entries that no longer exist in the source
+        if prune_root or not at_root:
+            keep = set(dirnames) | set(names.values())
+            for entry in os.scandir(target):
+                if entry.name not in keep:
+                    remove_path(Path(entry.path))
+
+        jobs.extend((os.path.join(dirpath, name), target / dest_name)
+                    for name, dest_name in names.items())
+
+    return copy_files(jobs, workers)
+
+
+def copy_files(jobs, workers=None):
+    """Run copy_if_changed over (src, dst) pairs concurrently; return the number copied."""
+    if not jobs:
+        return 0
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(lambda job: copy_if_changed(*job), jobs))
+
+
+def archive_package(package_dir):
+    """Compress the package folder into an archive next to it for distribution.
+
+    Uses multithreaded zstd (.tar.zst) when the zstandard module is installed,
+    otherwise falls back to a .zip. Returns the archive path.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+
+    if zstandard is not None:
+        archive = package_dir.with_name(package_dir.name + '.tar.zst')
+        compressor = zstandard.ZstdCompressor(level=10, threads=-1)
+        with open(archive, 'wb') as f, compressor.stream_writer(f, closefd=False) as writer:
+            with tarfile.open(fileobj=writer, mode='w|') as tar:
+                tar.add(package_dir, arcname=package_dir.name)
+        return archive
+
+    return Path(shutil.make_archive(str(package_dir), 'zip',
+                                    root_dir=package_dir.parent, base_dir=package_dir.name))
+
+
+# --- PACKAGE SIZE REPORTING ---
+
+def walk_files(root):
+    """Yield (path, size) for every file under root in one scandir pass."""
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file():
+                yield entry.path, entry.stat().st_size
+
+
+def tree_size(path):
+    """Total size of a directory tree; uses native `du` on Linux when available."""
+    if sys.platform.startswith('linux'):
+        try:
+            return int(subprocess.check_output(['du', '-sb', str(path)]).split()[0])
+        except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+            pass
+    return sum(size for _, size in walk_files(path))
+
+
+def list_top_level(root, workers=8):
+    """Return sorted (name, size, is_dir) for root's children, sizing folders as a whole.
+
+    Folders are sized concurrently so directory enumeration latency (slow on
+    NTFS and network shares) overlaps.
+    """
+    files, dirs = [], []
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            elif entry.is_file():
+                files.append((entry.name, entry.stat().st_size, False))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(tree_size, [d.path for d in dirs]))
+    return sorted(files + [(d.name, size, True) for d, size in zip(dirs, sizes)])
+
+
+# --- NUITKA ---
+
+def nuitka_command(project_root, onefile=True):
+    """Build the Nuitka command line for app_launcher.py.
+
+    Also points Nuitka at ccache (when installed) so unchanged C objects are
+    reused across builds.
+    """
+    cmd = [
+        sys.executable, '-m', 'nuitka',
+        '--standalone',
+    ]
+    if onefile:
+        cmd.append('--onefile')
+    cmd += [
+        f'--jobs={os.cpu_count() or 1}',
+        '--lto=yes',
+        '--enable-plugin=tk-inter',
+        '--enable-plugin=numpy',
+        '--nofollow-import-to=matplotlib',
+        '--nofollow-import-to=IPython',
+        '--include-data-dir=deepface_models=deepface_models',
+        '--include-data-file=haarcascade_frontalface_alt2.xml=haarcascade_frontalface_alt2.xml',
+    ]
+
+    # Add icon if exists
+    icon_file = project_root / 'icon.ico'
+    if icon_file.exists():
+        cmd.append(f'--windows-icon-from-ico={icon_file}')
+
+    # Add optional resources
+    for resource in ['send_button.png', 'background.jpg']:
+        if (project_root / resource).exists():
+            cmd.append(f'--include-data-file={resource}={resource}')
+
+    # Windows specific options
+    if sys.platform == 'win32':
+        cmd.append('--windows-disable-console')
+
+    # Output directory
+    cmd.extend(['--output-dir=dist', 'app_launcher.py'])
+
+    # Reuse compiled C objects across builds when ccache is installed
+    ccache = shutil.which('ccache')
+    if ccache:
+        os.environ.setdefault('NUITKA_CCACHE_BINARY', ccache)
+
+    return cmd
@@ -14,17 +14,25 @@ Options:
     --full          Full build with model preparation
     --skip-models   Skip model preparation (use existing)
     --clean         Clean build directories before building
+    --rebuild-analysis
+                    Discard PyInstaller's cached analysis (PyInstaller --clean)
     --onedir        Create one-directory bundle (default)
     --onefile       Create one-file executable
 """
 
 import os
 import sys
-import shutil
+import hashlib
 import subprocess
 import argparse
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
+from importlib import metadata
+
+from build_common import (hash_inputs, walk_files, sync_tree, copy_files, list_top_level,
+                          remove_trees)
 
 # Configure stdout to use UTF-8 encoding to support Unicode characters
 # This fixes encoding issues on Windows where default encoding is cp1252
@@ -34,6 +42,16 @@ if sys.platform == 'win32':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 
+def _tee(pipe, out, log=None):
+    """Copy lines from a subprocess pipe to out (and log, if given)."""
+    with pipe:
+        for line in pipe:
+            out.write(line)
+            if log is not None:
+                log.write(line)
+    out.flush()
+
+
 class PyInstallerBuilder:
     """Manages the build process using PyInstaller."""
     
@@ -44,6 +62,22 @@ class PyInstallerBuilder:
         self.build_dir = self.project_root / 'build'
         self.output_dir = self.dist_dir / 'FaceAttendanceSystem_Package'
         
+        # Files whose changes require re-running PyInstaller (deepface_models/ and
+        # the installed packages are added by inputs_digest)
+        self.PYINSTALLER_INPUTS = [
+            'app_launcher.py', 'app.py', 'config.py', 'resource_manager.py',
+            'FaceAttendanceSystem.spec', 'requirements-build.txt',
+            'haarcascade_frontalface_alt2.xml', 'send_button.png', 'background.jpg',
+        ]
+        self.models_dir = self.project_root / 'deepface_models'
+        # PyInstaller scratch files go to the temp dir (often tmpfs or a faster
+        # drive); the name is stable per checkout so the cache survives runs
+        checkout_id = hashlib.sha256(str(self.project_root.resolve()).encode()).hexdigest()[:8]
+        self.work_dir = Path(tempfile.gettempdir()) / f'pyinstaller_face_{checkout_id}'
+        self.inputs_stamp = self.work_dir / '.inputs.hash'
+        exe_name = 'FaceAttendanceSystem.exe' if sys.platform == 'win32' else 'FaceAttendanceSystem'
+        self.built_exe = self.dist_dir / 'FaceAttendanceSystem' / exe_name
+        
     def print_header(self, text):
         """Print a formatted header."""
         print("\n" + "=" * 80)
@@ -55,23 +89,38 @@ class PyInstallerBuilder:
         print(f"\n[{number}/{total}] {description}")
         print("-" * 80)
     
-    def run_command(self, cmd, description=None, check=True):
-        """Run a command and handle errors."""
+    def run_command(self, cmd, description=None, check=True, log_file=None):
+        """Run a command and handle errors.
+        
+        Output is read from a single pipe by a tee thread that echoes it and,
+        when log_file is given, also saves the complete log there.
+        """
         if description:
             print(f"\n> {description}")
         print(f"$ {' '.join(cmd) if isinstance(cmd, list) else cmd}")
         
         try:
-            if isinstance(cmd, str):
-                result = subprocess.run(cmd, shell=True, check=check, 
-                                       capture_output=False, text=True)
-            else:
-                result = subprocess.run(cmd, check=check, 
-                                       capture_output=False, text=True)
-            return result.returncode == 0
-        except subprocess.CalledProcessError as e:
-            print(f"\n❌ Command failed with exit code {e.returncode}")
-            return False
+            log = None
+            if log_file is not None:
+                log_file.parent.mkdir(parents=True, exist_ok=True)
+                log = open(log_file, 'w', encoding='utf-8')
+            try:
+                proc = subprocess.Popen(cmd, shell=isinstance(cmd, str),
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        text=True, bufsize=1, errors='replace')
+                tee = threading.Thread(target=_tee, args=(proc.stdout, sys.stdout, log), daemon=True)
+                tee.start()
+                returncode = proc.wait()
+                tee.join()
+            finally:
+                if log is not None:
+                    log.close()
+            
+            if returncode != 0 and check:
+                print(f"\n❌ Command failed with exit code {returncode}")
+                if log_file is not None:
+                    print(f"  Full log: {log_file}")
+            return returncode == 0
         except Exception as e:
             print(f"\n❌ Command failed: {e}")
             return False
@@ -80,13 +129,14 @@ class PyInstallerBuilder:
         """Clean build and dist directories."""
         self.step(1, 7, "Cleaning build directories")
         
-        dirs_to_clean = [self.dist_dir, self.build_dir]
+        dirs_to_clean = [self.dist_dir, self.work_dir]
         
-        for dir_path in dirs_to_clean:
-            if dir_path.exists():
-                print(f"  Removing {dir_path}")
-                shutil.rmtree(dir_path)
-                print(f"  ✓ Removed {dir_path}")
+        existing = [d for d in dirs_to_clean if d.exists()]
+        for dir_path in existing:
+            print(f"  Removing {dir_path}")
+        remove_trees(existing)
+        for dir_path in existing:
+            print(f"  ✓ Removed {dir_path}")
         
         print("\n✓ Build directories cleaned")
         return True
@@ -158,20 +208,27 @@ for file in data_files:
     if file_path.exists():
         datas.append((str(file_path), '.'))
 
-# Hidden imports (packages that PyInstaller might miss)
+# Hidden imports (packages that PyInstaller might miss). tensorflow/keras
+# and the deepface package itself are found through app.py's imports; only
+# the VGG-Face model (config.DEEPFACE_MODEL) is loaded by name at runtime.
+# Older deepface releases keep it in basemodels/, newer ones in models/.
 hiddenimports = [
     'PIL._tkinter_finder',
     'pkg_resources.extern',
-    'deepface',
-    'deepface.basemodels',
-    'deepface.extendedmodels',
+    'deepface.DeepFace',
+    'deepface.basemodels.VGGFace',
+    'deepface.models.facial_recognition.VGGFace',
     'deepface.commons',
-    'tensorflow',
-    'keras',
     'cv2',
     'retina_face',
 ]
 
+# Packages never used at runtime
+excludes = [
+    'matplotlib', 'IPython', 'jupyter',
+    'tensorboard', 'tensorflow.tools', 'tensorflow.contrib', 'keras.tests',
+]
+
 a = Analysis(
     ['app_launcher.py'],
     pathex=[],
@@ -181,7 +238,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=['matplotlib', 'IPython', 'jupyter'],
+    excludes=excludes,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -222,12 +279,40 @@ coll = COLLECT(
 '''
         
         spec_file = self.project_root / 'FaceAttendanceSystem.spec'
-        with open(spec_file, 'w', encoding='utf-8') as f:
-            f.write(spec_content)
+        spec_bytes = spec_content.encode('utf-8')
+        
+        # Keep the existing file (and its mtime) when nothing changed, so
+        # PyInstaller's incremental caching can kick in
+        if spec_file.exists():
+            if hashlib.sha256(spec_file.read_bytes()).digest() == hashlib.sha256(spec_bytes).digest():
+                print(f"✓ Spec unchanged, reusing: {spec_file}")
+                return True
+        
+        # Write atomically so an interrupted build never leaves a partial spec
+        tmp_file = spec_file.with_suffix('.spec.tmp')
+        tmp_file.write_bytes(spec_bytes)
+        os.replace(tmp_file, spec_file)
         
         print(f"✓ Created spec file: {spec_file}")
         return True
     
+    def inputs_digest(self):
+        """Hash everything bundled into the executable.
+
+        Covers PYINSTALLER_INPUTS, every file under deepface_models/ and the
+        name/version of each installed distribution, so upgrading a package in
+        site-packages (or switching environments) also forces a rebuild.
+        """
+        model_files = []
+        if self.models_dir.is_dir():
+            model_files = sorted(os.path.relpath(path, self.project_root)
+                                 for path, _ in walk_files(self.models_dir))
+        files_digest = hash_inputs(self.project_root, [*self.PYINSTALLER_INPUTS, *model_files])
+        dists = sorted(f"{dist.metadata['Name']}=={dist.version}" for dist in metadata.distributions())
+        digest = hashlib.blake2b(files_digest.encode(), digest_size=16)
+        digest.update('\n'.join(dists).encode())
+        return digest.hexdigest()
+    
     def build_with_pyinstaller(self):
         """Build the application with PyInstaller."""
         self.step(5, 7, "Building with PyInstaller")
@@ -238,20 +323,34 @@ coll = COLLECT(
             print("❌ Spec file not found")
             return False
         
-        # PyInstaller command
+        # Skip PyInstaller entirely when none of its inputs changed
+        rebuild = self.args.clean or self.args.rebuild_analysis
+        digest = self.inputs_digest()
+        if (not rebuild and self.built_exe.exists() and self.inputs_stamp.exists()
+                and self.inputs_stamp.read_text() == digest):
+            print(f"✓ Inputs unchanged, reusing {self.built_exe}")
+            return True
+        
+        # PyInstaller command; without --clean PyInstaller reuses its cached
+        # Analysis/PYZ/PKG results in build/ for unchanged modules
         cmd = [
-            sys.executable, '-m', 'PyInstaller',
-            '--clean',
-            '--noconfirm',
+            sys.executable, '-m', 'PyInstaller', '--noconfirm',
+            '--workpath', str(self.work_dir),
+            '--distpath', str(self.dist_dir),
             str(spec_file)
         ]
+        if rebuild:
+            cmd.insert(3, '--clean')
         
         print("Building executable (this may take 5-10 minutes)...")
         print("Command:", ' '.join(cmd))
         
-        success = self.run_command(cmd, "Running PyInstaller build")
+        success = self.run_command(cmd, "Running PyInstaller build",
+                                   log_file=self.build_dir / 'pyinstaller.log')
         
         if success:
+            self.inputs_stamp.parent.mkdir(parents=True, exist_ok=True)
+            self.inputs_stamp.write_text(digest)
             print("\n✓ PyInstaller build completed successfully")
         
         return success
@@ -271,12 +370,10 @@ coll = COLLECT(
             print(f"❌ Built application not found: {built_dir}")
             return False
         
-        # Copy the entire built directory
+        # Mirror the built directory (parallel, unchanged files are skipped)
         target_dir = self.output_dir / 'FaceAttendanceSystem'
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-        shutil.copytree(built_dir, target_dir)
-        print(f"  ✓ Copied application: {target_dir}")
+        copied = sync_tree(built_dir, target_dir)
+        print(f"  ✓ Copied application: {target_dir} ({copied} files updated)")
         
         # Create face_database directory
         db_dir = self.output_dir / 'face_database'
@@ -288,23 +385,16 @@ coll = COLLECT(
         self.create_readme(readme_path)
         print(f"  ✓ Created: {readme_path}")
         
-        # Copy documentation files
-        doc_files = ['QUICKSTART.txt', 'USER_GUIDE.md', 'LICENSE']
-        for doc_file in doc_files:
-            src = self.project_root / doc_file
+        # Copy documentation files and additional resources in one batch
+        extra_files = ['QUICKSTART.txt', 'USER_GUIDE.md', 'LICENSE', 'send_button.png', 'background.jpg']
+        jobs = []
+        for name in extra_files:
+            src = self.project_root / name
             if src.exists():
-                dest = self.output_dir / (doc_file if doc_file != 'LICENSE' else 'LICENSE.txt')
-                shutil.copy2(src, dest)
-                print(f"  ✓ Copied: {doc_file}")
-        
-        # Copy additional resources
-        resources = ['send_button.png', 'background.jpg']
-        for resource in resources:
-            resource_src = self.project_root / resource
-            if resource_src.exists():
-                resource_dest = self.output_dir / resource
-                shutil.copy2(resource_src, resource_dest)
-                print(f"  ✓ Copied: {resource}")
+                jobs.append((src, self.output_dir / (name if name != 'LICENSE' else 'LICENSE.txt')))
+        copy_files(jobs)
+        for src, _ in jobs:
+            print(f"  ✓ Copied: {src.name}")
         
         # Create run script for easy execution
         if sys.platform == 'win32':
@@ -423,14 +513,15 @@ Built with PyInstaller
         print(f"Output directory: {self.output_dir}")
         print(f"\nPackage contents:")
         
-        for item in sorted(self.output_dir.rglob('*')):
-            if item.is_file():
-                size = item.stat().st_size
-                rel_path = item.relative_to(self.output_dir)
-                print(f"  {rel_path} ({size / 1024 / 1024:.2f} MB)")
+        # One scandir pass; the bundle folder (thousands of files) is listed
+        # once with its total size
+        entries = list_top_level(self.output_dir)
+        for name, size, is_dir in entries:
+            suffix = os.sep if is_dir else ''
+            print(f"  {name}{suffix} ({size / 1024 / 1024:.2f} MB)")
         
         # Calculate total size
-        total_size = sum(f.stat().st_size for f in self.output_dir.rglob('*') if f.is_file())
+        total_size = sum(size for _, size, _ in entries)
         print(f"\nTotal package size: {total_size / 1024 / 1024:.2f} MB")
         
         print("\n" + "=" * 80)
@@ -487,6 +578,8 @@ def main():
                        help='Skip model preparation (use existing)')
     parser.add_argument('--clean', action='store_true',
                        help='Clean build directories before building')
+    parser.add_argument('--rebuild-analysis', action='store_true',
+                       help="Discard PyInstaller's cached analysis (PyInstaller --clean)")
     parser.add_argument('--onefile', action='store_true',
                        help='Create single-file executable (not recommended for this app)')
     parser.add_argument('--onedir', action='store_true', default=True,
@@ -19,6 +19,8 @@ Usage:
 
 import os
 import sys
+import functools
+import importlib.util
 from pathlib import Path
 
 
@@ -130,12 +132,17 @@ def setup_dpi_awareness():
             print(f"  Warning: Could not set DPI awareness: {e}")
 
 
+@functools.lru_cache(maxsize=1)
 def check_dependencies():
     """
     Check if all required dependencies are available.
     
+    Modules are located with importlib.util.find_spec rather than imported,
+    so TensorFlow and friends are not loaded just for the check. The result
+    is cached for repeated initialize_application() calls.
+    
     Returns:
-        tuple: (success: bool, missing: list)
+        tuple: (success: bool, missing: tuple)
     """
     required_modules = [
         'cv2',
@@ -148,13 +155,7 @@ def check_dependencies():
         'tensorflow',
     ]
     
-    missing = []
-    
-    for module_name in required_modules:
-        try:
-            __import__(module_name)
-        except ImportError:
-            missing.append(module_name)
+    missing = tuple(m for m in required_modules if importlib.util.find_spec(m) is None)
     
     return (len(missing) == 0, missing)
 
@@ -30,9 +30,19 @@ def copy_cascade():
         print(f"  Source: {src_path}")
         print(f"  Destination: {dest_path}")
         
-        shutil.copy2(src_path, dest_path)
-        
-        print(f"✓ Cascade file copied successfully")
+        if os.path.exists(dest_path) and os.path.samefile(src_path, dest_path):
+            print(f"✓ Cascade file already linked")
+        else:
+            # Hard link when on the same volume (no data copied); fall back to
+            # a real copy across devices or where links are not permitted
+            try:
+                if os.path.exists(dest_path):
+                    os.remove(dest_path)
+                os.link(src_path, dest_path)
+                print(f"✓ Cascade file hard-linked successfully")
+            except (OSError, AttributeError, NotImplementedError):
+                shutil.copy2(src_path, dest_path)
+                print(f"✓ Cascade file copied successfully")
         print(f"  Size: {os.path.getsize(dest_path) / 1024:.1f} KB")
         
         return True
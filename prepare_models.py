@@ -12,8 +12,36 @@ Usage:
 import os
 import sys
 import shutil
+import asyncio
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# Weight files DeepFace downloads on first use (into <deepface home>/weights).
+# Fetching them up front lets the downloads run concurrently; DeepFace skips
+# its own sequential download when a file is already present.
+DEEPFACE_WEIGHT_URLS = {
+    'vgg_face_weights.h5':
+        'https://github.com/serengil/deepface_models/releases/download/v1.0/vgg_face_weights.h5',
+    'deploy.prototxt':
+        'https://github.com/opencv/opencv/raw/3.4.0/samples/dnn/face_detector/deploy.prototxt',
+    'res10_300x300_ssd_iter_140000.caffemodel':
+        'https://github.com/opencv/opencv_3rdparty/raw/dnn_samples_face_detector_20170830/'
+        'res10_300x300_ssd_iter_140000.caffemodel',
+}
+
+YUNET_FILE = 'face_detection_yunet_2023mar.onnx'
+YUNET_URL = ('https://github.com/opencv/opencv_zoo/raw/main/models/'
+             'face_detection_yunet/face_detection_yunet_2023mar.onnx')
+
+PREFETCH_CONNECTIONS = 8
+
 
 def get_deepface_home():
     """Get the DeepFace home directory where models are cached."""
@@ -28,6 +56,81 @@ def get_deepface_home():
         return Path.home() / '.deepface'
 
 
+async def _fetch_all_async(jobs):
+    """Download (url, dest) pairs concurrently over one aiohttp session."""
+    connector = aiohttp.TCPConnector(limit=PREFETCH_CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def fetch(url, dest):
+            part = dest.with_name(dest.name + '.part')
+            async with session.get(url) as response:
+                response.raise_for_status()
+                with open(part, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(1024 * 1024):
+                        f.write(chunk)
+            os.replace(part, dest)
+            return dest
+        
+        return await asyncio.gather(*(fetch(url, dest) for url, dest in jobs),
+                                    return_exceptions=True)
+
+
+def _fetch_all_threaded(jobs):
+    """Download (url, dest) pairs concurrently with urllib worker threads."""
+    def fetch(job):
+        url, dest = job
+        part = dest.with_name(dest.name + '.part')
+        try:
+            urllib.request.urlretrieve(url, str(part))
+            os.replace(part, dest)
+            return dest
+        except Exception as e:
+            return e
+    
+    with ThreadPoolExecutor(max_workers=PREFETCH_CONNECTIONS) as executor:
+        return list(executor.map(fetch, jobs))
+
+
+def prefetch_model_files():
+    """Download all model weight files concurrently before DeepFace needs them."""
+    print("=" * 80)
+    print("PREFETCHING MODEL FILES")
+    print("=" * 80)
+    
+    weights_dir = get_deepface_home() / 'weights'
+    project_models_dir = Path(__file__).parent / 'deepface_models'
+    targets = [(url, weights_dir / name) for name, url in DEEPFACE_WEIGHT_URLS.items()]
+    targets.append((YUNET_URL, project_models_dir / YUNET_FILE))
+    jobs = [(url, dest) for url, dest in targets if not dest.exists()]
+    
+    if not jobs:
+        print("\n✓ All model files already downloaded\n")
+        return True
+    
+    for _, dest in jobs:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+    
+    print(f"\nDownloading {len(jobs)} files concurrently "
+          f"({'aiohttp' if aiohttp is not None else 'threads'})...")
+    if aiohttp is not None:
+        results = asyncio.run(_fetch_all_async(jobs))
+    else:
+        results = _fetch_all_threaded(jobs)
+    
+    # Failures are not fatal: DeepFace retries its own download afterwards
+    for (url, dest), result in zip(jobs, results):
+        part = dest.with_name(dest.name + '.part')
+        if isinstance(result, Exception):
+            print(f"  ⚠ {dest.name}: {result}")
+            if part.exists():
+                part.unlink()
+        else:
+            print(f"  ✓ {dest.name} ({dest.stat().st_size / 1024 / 1024:.1f} MB)")
+    print()
+    return True
+
+
 def download_models():
     """Download required DeepFace models by triggering their first use."""
     print("=" * 80)
@@ -179,6 +282,48 @@ def copy_models_to_project():
     return True
 
 
+def export_onnx_model():
+    """Export VGG-Face to an int8-quantized ONNX graph for ONNX Runtime (optional)."""
+    print("\n" + "=" * 80)
+    print("EXPORTING ONNX MODEL")
+    print("=" * 80)
+    
+    project_models_dir = Path(__file__).parent / 'deepface_models'
+    fp32_path = project_models_dir / 'vgg_face.onnx'
+    int8_path = project_models_dir / 'vgg_face_int8.onnx'
+    
+    try:
+        import tensorflow as tf
+        import tf2onnx
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        from deepface import DeepFace
+    except ImportError as e:
+        print(f"\n⚠ Skipping ONNX export (optional libraries not installed: {e})")
+        print("  Install with: pip install tf2onnx onnxruntime")
+        return True
+    
+    try:
+        project_models_dir.mkdir(exist_ok=True)
+        model = DeepFace.build_model('VGG-Face')
+        keras_model = getattr(model, 'model', model)
+        input_signature = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name='input'),)
+        
+        print("Converting VGG-Face to ONNX...")
+        tf2onnx.convert.from_keras(keras_model, input_signature=input_signature, output_path=str(fp32_path))
+        
+        print("Quantizing weights to int8...")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+        
+        print(f"✓ Exported {int8_path.name} ({int8_path.stat().st_size / 1024 / 1024:.1f} MB)")
+    except Exception as e:
+        print(f"\n⚠ ONNX export failed, the application will use TensorFlow: {e}")
+        if fp32_path.exists():
+            fp32_path.unlink()
+    
+    return True
+
+
 def verify_models():
     """Verify that all required models are present in project directory."""
     print("\n" + "=" * 80)
@@ -228,7 +373,8 @@ def main():
     print("╚" + "=" * 78 + "╝")
     print("\n")
     
-    # Step 1: Download models
+    # Step 1: Download models (weight files are prefetched concurrently first)
+    prefetch_model_files()
     if not download_models():
         print("\n⚠ Model download failed. Please check your internet connection")
         print("and ensure all dependencies are installed.")
@@ -239,7 +385,12 @@ def main():
         print("\n⚠ Model copy failed. Models may need to be downloaded again.")
         return False
     
-    # Step 3: Verify models
+    # Step 3: Export int8 ONNX model (optional, never fail the preparation).
+    # The YuNet face detector was fetched by prefetch_model_files; without it
+    # the application uses the Haar cascade.
+    export_onnx_model()
+    
+    # Step 4: Verify models
     if not verify_models():
         print("\n⚠ Model verification failed.")
         return False